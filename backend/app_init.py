@@ -1,5 +1,6 @@
 from flask import Flask, request
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import logging
 from dotenv import load_dotenv
 import threading
@@ -16,6 +17,7 @@ from utils.cache_manager import start_cache_cleanup_thread
 from utils.price_updater import start_price_cache_updater
 from routes.optimized_routes import register_optimized_routes
 from utils.performance_utils import configure_logging, metrics
+from utils.json_provider import OrjsonProvider, ORJSON_AVAILABLE
 
 load_dotenv()
 
@@ -34,6 +36,9 @@ configure_logging(
 )
 logger = logging.getLogger(__name__)
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    # orjson behind request.get_json()/jsonify for every route
+    app.json = OrjsonProvider(app)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "supersecretkey_change_in_production")
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 
@@ -51,11 +56,30 @@ else:
     # Production: strict, cross-site compatible cookies for OAuth.
     app.config['SESSION_COOKIE_SECURE'] = True   # Requires HTTPS
     app.config['SESSION_COOKIE_SAMESITE'] = 'None'  # Required for cross-origin cookies
+    # Render's proxy sits in front of the app: take the client address from
+    # the one X-Forwarded-For entry it appends, so request.remote_addr (and
+    # the per-IP rate limits) see the real client instead of the proxy.
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
 
 app.config['SESSION_COOKIE_DOMAIN'] = None
 app.config['SESSION_PERMANENT'] = True
 app.config['PERMANENT_SESSION_LIFETIME'] = 86400 * 7  # 7 days in seconds
 
+# Optional server-side sessions: with REDIS_URL set, the cookie carries only
+# a session id and the payload lives in Redis (shared by every worker).
+# Without it, Flask's signed-cookie sessions are used as before.
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    try:
+        import redis
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = 'redis'
+        app.config['SESSION_REDIS'] = redis.Redis.from_url(REDIS_URL)
+        Session(app)
+        logger.info("Using Redis-backed server-side sessions")
+    except ImportError:
+        logger.warning("REDIS_URL is set but Flask-Session/redis are not installed; using cookie sessions")
+
 # CORS allowed origins - production and local development
 ALLOWED_ORIGINS = [
     FRONTEND_URL,  # Primary frontend URL
@@ -158,6 +182,8 @@ def initialize_app():
         try:
             logger.info("Loading dataset and building search index...")
             global df
+            # load_dataset reuses the Parquet cache and optimizes dtypes on
+            # the whole frame (per-chunk categoricals wouldn't survive concat)
             df = load_dataset()
             df = tokenize_all_columns(df)
             search_engine.build_index(df)
@@ -16,6 +16,7 @@ ARCHITECTURE:
 
 import math
 import logging
+import re
 from typing import List, Tuple, Dict, Any
 from collections import Counter, defaultdict
 from core.query_filter_engine import query_filter_engine
@@ -159,9 +160,9 @@ class StockBM25Ranker:
         inverted_index = defaultdict(list)
         
         for idx, snapshot in enumerate(stock_snapshots):
-            tokens = snapshot.get('tokens', [])
             # Use set to avoid counting same token multiple times for same doc
-            for token in set(tokens):
+            token_set = snapshot.get('_tokens_set') or set(snapshot.get('tokens', []))
+            for token in token_set:
                 inverted_index[token].append(idx)
         
         return dict(inverted_index)
@@ -306,7 +307,10 @@ class RealTimeStockRanker:
             tokens = self.stock_tokenizer.tokenize_stock(stock)
             tokenized_snapshot = {
                 **stock,  # Preserve all original data
-                'tokens': tokens  # Add tokens
+                'tokens': tokens,  # Add tokens
+                # WHY: Hashed once here, then reused by hard filtering and
+                # by the BM25 inverted index instead of each building a set
+                '_tokens_set': frozenset(tokens)
             }
             tokenized_snapshots.append(tokenized_snapshot)
         
@@ -388,7 +392,6 @@ class RealTimeStockRanker:
         ]
         
         # Check for growth intent in query using word boundaries
-        import re
         wants_positive = any(
             re.search(r'\b' + re.escape(kw) + r'\b', query_lower)
             for kw in growth_positive_keywords
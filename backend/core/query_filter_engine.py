@@ -19,10 +19,26 @@ ARCHITECTURE:
 """
 
 import logging
-from typing import Dict, List, Any, Set, Optional
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Set, Optional, Tuple
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    ahocorasick = None
+    AHOCORASICK_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Query words; same boundaries as a \b...\b whole-word match
+_WORD_RE = re.compile(r'\w+')
+
+
+def _is_word_char(char: str) -> bool:
+    """Same character class as regex \\w"""
+    return char.isalnum() or char == '_'
+
 
 class QueryFilterEngine:
     """
@@ -73,6 +89,32 @@ class QueryFilterEngine:
             'manufacturing': 'sector_industrials',
         }
         
+        # HARD FILTER KEYWORDS BY TYPE
+        # WHY: One table drives extraction for every hard filter type;
+        # a new type only needs an entry here (see EXTENSION GUIDE)
+        self.hard_filter_keywords = {
+            'sector': self.sector_keywords,
+        }
+        
+        # Keyword → position in its mapping; earlier keywords win within a type
+        self._keyword_priority = {
+            filter_type: {keyword: i for i, keyword in enumerate(keywords)}
+            for filter_type, keywords in self.hard_filter_keywords.items()
+        }
+        # One automaton over all keywords of all types (None without pyahocorasick)
+        # WHY: A single pass over the query finds every keyword hit, however
+        # many keywords and filter types there are; multi-word keywords work too
+        self._keyword_automaton = self._build_keyword_automaton()
+        # Without the automaton, single-word keywords are matched by set
+        # membership and multi-word ones by one alternation per filter type
+        self._multiword_patterns = (
+            self._build_multiword_patterns() if self._keyword_automaton is None else {}
+        )
+        
+        # Parsed filters per normalized query, bound to this instance's mappings
+        # WHY: Users repeat the same queries ("tech stocks"); a repeat costs one lookup
+        self._extract_cached = lru_cache(maxsize=1024)(self._extract_impl)
+        
         # TOKEN → FILTER TYPE MAPPING
         # WHY: Enables generic filter application logic
         # IMPORTANT: Only sector/industry are HARD constraints
@@ -83,6 +125,17 @@ class QueryFilterEngine:
             # NOTE: growth_, market_cap_, rsi_, etc. should be ranking signals,
             # not hard filters. They're handled by BM25, not by this filter engine.
         }
+        # WHY: Prefixes of the form "category_" are found by one hash lookup
+        # of the token's text up to its first '_', however many there are;
+        # any with an inner '_' (e.g. "market_cap_") use one startswith(tuple)
+        self._hard_prefix_set = frozenset(
+            prefix for prefix in self.filter_type_prefixes
+            if prefix.find('_') == len(prefix) - 1
+        )
+        self._hard_prefix_tuple = tuple(
+            prefix for prefix in self.filter_type_prefixes
+            if prefix not in self._hard_prefix_set
+        )
     
     def extract_hard_filters(self, query: str) -> Dict[str, str]:
         """
@@ -104,24 +157,12 @@ class QueryFilterEngine:
             
         EXTENSION POINT: Add new filter types by:
         1. Adding keyword mapping dictionary
-        2. Adding extraction logic in this function
+        2. Adding extraction logic in _extract_impl (results are cached per query)
         3. Filter application automatically handles new types
         """
         query_lower = query.lower().strip()
-        hard_filters = {}
-        
-        # EXTRACT SECTOR FILTER ONLY
-        # WHY: Sector is the ONLY mandatory constraint
-        # Growth, market cap, volume, etc. are ranking signals, NOT filters
-        # Use word boundaries to avoid false matches (e.g., "momentum" shouldn't match "tech")
-        import re
-        for keyword, sector_token in self.sector_keywords.items():
-            # Match keyword as a whole word only
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            if re.search(pattern, query_lower):
-                hard_filters['sector'] = sector_token
-                logger.info(f"Extracted sector filter: {sector_token} (from keyword: '{keyword}')")
-                break  # Only one sector per query
+        # Fresh dict per call so callers can't mutate the cached parse
+        hard_filters = dict(self._extract_cached(query_lower))
         
         if hard_filters:
             logger.info(f"Hard filters extracted from '{query}': {hard_filters}")
@@ -130,6 +171,108 @@ class QueryFilterEngine:
         
         return hard_filters
     
+    def _extract_impl(self, query_lower: str) -> Tuple[Tuple[str, str], ...]:
+        """
+        Uncached body of extract_hard_filters, as (filter_type, token) pairs.
+        
+        Args:
+            query_lower: Lowercased, stripped query
+        """
+        hard_filters = []
+        
+        # EXTRACT SECTOR FILTER ONLY (the only type in hard_filter_keywords)
+        # WHY: Sector is the ONLY mandatory constraint
+        # Growth, market cap, volume, etc. are ranking signals, NOT filters
+        matched = self._match_keywords(query_lower)
+        for filter_type, keywords in self.hard_filter_keywords.items():
+            keyword = matched.get(filter_type)
+            if keyword is None:
+                continue
+            # Only one filter per type: the keyword listed first in its mapping
+            filter_token = keywords[keyword]
+            hard_filters.append((filter_type, filter_token))
+            logger.info(f"Extracted {filter_type} filter: {filter_token} (from keyword: '{keyword}')")
+        
+        return tuple(hard_filters)
+    
+    def _match_keywords(self, query_lower: str) -> Dict[str, str]:
+        """
+        Find the winning whole-word keyword per filter type.
+        
+        Args:
+            query_lower: Lowercased, stripped query
+            
+        Returns:
+            filter_type → keyword listed earliest in its mapping among the hits
+        """
+        best: Dict[str, Tuple[int, str]] = {}
+        
+        if self._keyword_automaton is not None:
+            last = len(query_lower) - 1
+            for end, (keyword, entries) in self._keyword_automaton.iter(query_lower):
+                start = end - len(keyword) + 1
+                # Match whole words only to avoid false matches (e.g., "momentum" shouldn't match "tech")
+                if start > 0 and _is_word_char(query_lower[start - 1]):
+                    continue
+                if end < last and _is_word_char(query_lower[end + 1]):
+                    continue
+                for filter_type, priority in entries:
+                    if filter_type not in best or priority < best[filter_type][0]:
+                        best[filter_type] = (priority, keyword)
+        else:
+            # Whole-word match of single-word keywords is just set membership;
+            # dict key views intersect with sets directly, no keyword set needed
+            words = set(_WORD_RE.findall(query_lower))
+            for filter_type, priority in self._keyword_priority.items():
+                matched = words & priority.keys()
+                pattern = self._multiword_patterns.get(filter_type)
+                if pattern is not None:
+                    matched.update(pattern.findall(query_lower))
+                if matched:
+                    keyword = min(matched, key=priority.__getitem__)
+                    best[filter_type] = (priority[keyword], keyword)
+        
+        return {filter_type: keyword for filter_type, (_, keyword) in best.items()}
+    
+    def _build_keyword_automaton(self):
+        """
+        Build an Aho-Corasick automaton over every hard filter keyword.
+        
+        Each keyword maps to (keyword, ((filter_type, priority), ...)) so one
+        keyword may serve several filter types.
+        Returns None when pyahocorasick is not installed.
+        """
+        if not AHOCORASICK_AVAILABLE:
+            return None
+        
+        entries: Dict[str, List[Tuple[str, int]]] = {}
+        for filter_type, priorities in self._keyword_priority.items():
+            for keyword, priority in priorities.items():
+                entries.setdefault(keyword, []).append((filter_type, priority))
+        
+        automaton = ahocorasick.Automaton()
+        for keyword, keyword_entries in entries.items():
+            automaton.add_word(keyword, (keyword, tuple(keyword_entries)))
+        automaton.make_automaton()
+        return automaton
+    
+    def _build_multiword_patterns(self) -> Dict[str, "re.Pattern[str]"]:
+        """
+        Compile one whole-word alternation per filter type over its
+        multi-word keywords (fallback for when pyahocorasick is missing).
+        
+        The lookahead makes findall report every match start, so keywords
+        that overlap in the query are all found; at one position the
+        earliest-listed keyword wins, which is also the priority order.
+        """
+        patterns = {}
+        for filter_type, priorities in self._keyword_priority.items():
+            multiword = [keyword for keyword in priorities if not _WORD_RE.fullmatch(keyword)]
+            if multiword:
+                alternation = '|'.join(map(re.escape, multiword))
+                patterns[filter_type] = re.compile(rf'(?=\b({alternation})\b)')
+        return patterns
+    
     def apply_filters(
         self,
         stocks: List[Dict[str, Any]],
@@ -142,7 +285,8 @@ class QueryFilterEngine:
         A stock passes ONLY IF it satisfies EVERY hard filter.
         
         Args:
-            stocks: List of stock snapshots with 'tokens' field
+            stocks: List of stock snapshots with 'tokens' field (and
+                optionally '_tokens_set', a frozenset of the same tokens)
             hard_filters: Dictionary of filter_type → filter_token
             
         Returns:
@@ -169,20 +313,36 @@ class QueryFilterEngine:
             logger.debug("No hard filters to apply")
             return stocks
         
-        # Convert filter dict to set of required tokens
-        # WHY: Set operations enable efficient AND logic checking
-        required_tokens = set(hard_filters.values())
+        # Convert filter dict to the distinct required tokens, once per call
+        required_tokens = frozenset(hard_filters.values())
         
-        logger.info(f"Applying hard filters (AND logic): {required_tokens}")
+        logger.info(f"Applying hard filters (AND logic): {set(required_tokens)}")
         
-        filtered_stocks = []
+        # WHY: Usually one required token; a few `in` checks against the
+        # stock's token list beat building a set per stock per query
+        # Prefer the frozenset cached at ingest (see RealTimeStockRanker);
+        # `in` works the same on it and on the plain token list
+        required = tuple(required_tokens)
+        # Locals for the loops below: no global/attribute lookup per stock
+        get = dict.get
         
-        for stock in stocks:
-            stock_tokens = set(stock.get('tokens', []))
-            
+        if len(required) == 1:
+            # Common case (one sector): a single membership test per stock
+            needle = required[0]
+            filtered_stocks = [
+                stock for stock in stocks
+                if needle in (get(stock, '_tokens_set') or get(stock, 'tokens', ()))
+            ]
+        else:
             # Check if stock contains ALL required tokens (AND logic)
-            if required_tokens.issubset(stock_tokens):
-                filtered_stocks.append(stock)
+            # WHY: An inline subset test avoids a Python function call per
+            # stock; only snapshots without the cached set build one here
+            filtered_stocks = [
+                stock for stock in stocks
+                if required_tokens <= (
+                    get(stock, '_tokens_set') or frozenset(get(stock, 'tokens', ()))
+                )
+            ]
         
         logger.info(
             f"Filter results: {len(stocks)} stocks → {len(filtered_stocks)} stocks "
@@ -218,8 +378,33 @@ class QueryFilterEngine:
         ranked_results = bm25_ranker.rank(query_tokens, filtered_stocks)
         ```
         """
+        return self.filter_stocks_with_filters(query, stocks)[1]
+    
+    def filter_stocks_with_filters(
+        self,
+        query: str,
+        stocks: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+        """
+        Same as filter_stocks, but also returns the extracted hard filters.
+        
+        WHY: Callers that report or log the filters would otherwise parse the
+        query a second time via extract_hard_filters/get_filter_tokens_from_query.
+        
+        Args:
+            query: Raw user query string
+            stocks: List of tokenized stock snapshots
+            
+        Returns:
+            (hard_filters, filtered_stocks)
+        """
         hard_filters = self.extract_hard_filters(query)
-        return self.apply_filters(stocks, hard_filters)
+        
+        # No constraints (e.g. ticker searches like "AAPL") → nothing to apply
+        if not hard_filters:
+            return hard_filters, stocks
+        
+        return hard_filters, self.apply_filters(stocks, hard_filters)
     
     def get_filter_tokens_from_query(self, query: str) -> Set[str]:
         """
@@ -254,9 +439,11 @@ class QueryFilterEngine:
             
         EXTENSION POINT: Add new prefixes to filter_type_prefixes
         """
-        for prefix in self.filter_type_prefixes.keys():
-            if token.startswith(prefix):
-                return 'hard'
+        idx = token.find('_')
+        if idx >= 0 and token[:idx + 1] in self._hard_prefix_set:
+            return 'hard'
+        if token.startswith(self._hard_prefix_tuple):
+            return 'hard'
         
         # All other tokens are soft ranking signals
         # Examples: price_up, volume_high, rsi_overbought (when not filtered)
@@ -289,7 +476,7 @@ class QueryFilterEngine:
 # ================
 # To add a new filter type (e.g., RSI filters):
 #
-# 1. Add keyword mapping:
+# 1. Add keyword mapping (multi-word keywords are fine):
 #    self.rsi_keywords = {
 #        'overbought': 'rsi_overbought',
 #        'oversold': 'rsi_oversold',
@@ -298,11 +485,9 @@ class QueryFilterEngine:
 # 2. Add to filter_type_prefixes:
 #    'rsi_': 'rsi'
 #
-# 3. Add extraction logic in extract_hard_filters():
-#    for keyword, rsi_token in self.rsi_keywords.items():
-#        if keyword in query_lower:
-#            hard_filters['rsi'] = rsi_token
-#            break
+# 3. Register it in hard_filter_keywords:
+#    'rsi': self.rsi_keywords,
+#    Extraction matches it in the same single pass as sector keywords
 #
 # 4. No changes needed in apply_filters() - it handles all filter types generically
 #
@@ -1,6 +1,6 @@
-from flask import jsonify, session, request
+from flask import jsonify, session, request, g
 from app_init import app, logger
-from utils.jwt_utils import verify_jwt
+from utils.jwt_utils import verify_jwt_cached
 import jwt
 
 class APIError(Exception):
@@ -25,20 +25,27 @@ def require_auth():
     def decorator(f):
         def wrapped(*args, **kwargs):
             # Prefer session-based auth if available (backwards compatible)
-            if 'username' not in session:
+            if 'username' in session:
+                g.auth_username = session['username']
+                g.auth_email = session.get('email')
+            else:
                 # Fallback to JWT-based auth via Authorization: Bearer <token>
                 auth_header = request.headers.get("Authorization", "")
                 if auth_header.startswith("Bearer "):
                     token = auth_header.split(" ", 1)[1].strip()
                     try:
-                        payload = verify_jwt(token)
-                        # Optionally hydrate session for downstream code
-                        session['username'] = payload.get("username")
-                        session['email'] = payload.get("email")
+                        payload = verify_jwt_cached(token)
                     except jwt.ExpiredSignatureError:
                         raise APIError('Session expired. Please log in again.', 401)
                     except jwt.InvalidTokenError:
                         raise APIError('Invalid authentication token.', 401)
+                    if not payload.get("username"):
+                        raise APIError('Invalid authentication token.', 401)
+                    # Stateless: identity lives on flask.g for this request.
+                    # Writing it into the session would re-sign and re-send
+                    # the cookie on every Bearer-authenticated response.
+                    g.auth_username = payload["username"]
+                    g.auth_email = payload.get("email")
                 else:
                     raise APIError('Authentication required', 401)
             return f(*args, **kwargs)
@@ -47,4 +54,46 @@ def require_auth():
     return decorator
 
 
-__all__ = ["APIError", "require_auth"]
+def rate_limit(*limiters, key_func):
+    """
+    Reject a request with 429 once key_func()'s key exceeds any limiter.
+
+    Runs before the view, so throttled requests skip the DB and password hashing.
+    """
+    def decorator(f):
+        def wrapped(*args, **kwargs):
+            key = key_func()
+            for limiter in limiters:
+                if not limiter.hit(key):
+                    raise APIError('Too many attempts. Please try again later.', 429)
+            return f(*args, **kwargs)
+        wrapped.__name__ = f.__name__
+        return wrapped
+    return decorator
+
+
+def limit_failures(*limiters, key_func, status_code=401):
+    """
+    Reject a request with 429 once key_func()'s key has too many failures.
+
+    Only calls whose view raises APIError with status_code count, so
+    successful attempts never use up the quota.
+    """
+    def decorator(f):
+        def wrapped(*args, **kwargs):
+            key = key_func()
+            if any(limiter.is_limited(key) for limiter in limiters):
+                raise APIError('Too many attempts. Please try again later.', 429)
+            try:
+                return f(*args, **kwargs)
+            except APIError as e:
+                if e.status_code == status_code:
+                    for limiter in limiters:
+                        limiter.hit(key)
+                raise
+        wrapped.__name__ = f.__name__
+        return wrapped
+    return decorator
+
+
+__all__ = ["APIError", "require_auth", "rate_limit", "limit_failures"]
@@ -110,12 +110,9 @@ def verify_filter_engine():
         print(f"\nTest: {description}")
         print(f"Query: '{query}'")
         
-        # Extract filters
-        filters = query_filter_engine.extract_hard_filters(query)
+        # Extract and apply filters
+        filters, filtered = query_filter_engine.filter_stocks_with_filters(query, stocks)
         print(f"Extracted filters: {filters}")
-        
-        # Apply filtering
-        filtered = query_filter_engine.filter_stocks(query, stocks)
         result = set(s['symbol'] for s in filtered)
         
         print(f"Expected: {sorted(expected)}")
@@ -1,26 +1,199 @@
-from flask import request, jsonify, redirect, session, url_for
-from utils.database import get_connection, hash_password
+from flask import request, jsonify, redirect, session, g
+from utils.database import get_connection, hash_password, verify_password, password_needs_rehash
 from app_init import app, logger, FRONTEND_URL
-from errors import APIError, require_auth
-from utils.jwt_utils import create_jwt
+from errors import APIError, require_auth, rate_limit, limit_failures
+from utils.jwt_utils import create_jwt, verify_jwt_cached
+from utils.rate_limiter import RateLimiter
+from utils.cache_manager import LRUCache
 import sqlite3
+import jwt
+import json
 import os
+import re
+import threading
+import time
 import requests
-from urllib.parse import urlencode, quote
+from collections import namedtuple
+from functools import lru_cache
+from typing import Final
+from urllib.parse import urlencode
 from google.auth.transport import requests as google_requests
 from google.oauth2 import id_token
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared HTTP session for Google token/userinfo calls: keep-alive reuses
+# the TCP+TLS connection instead of a new handshake per OAuth callback
+# Idempotent GETs are retried on transient gateway errors; urllib3 never
+# retries the token POST (an authorization code is single-use).
+_GOOGLE_SESSION = requests.Session()
+_GOOGLE_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504]),
+))
+# (connect, read) timeouts: fail fast on an unreachable host
+_GOOGLE_TIMEOUT = (3, 7)
+# Signing certs (key id -> PEM) that verify_oauth2_token fetches by default
+_GOOGLE_CERTS_URL: Final = "https://www.googleapis.com/oauth2/v1/certs"
+
+
+class _CachedGoogleRequest(google_requests.Request):
+    """
+    google-auth transport over the shared session that remembers GET
+    responses. id_token verification only GETs Google's signing certs,
+    so callbacks skip that round trip for as long as Google's
+    Cache-Control max-age allows.
+    """
+
+    # Used when a response carries no max-age
+    _DEFAULT_TTL = 3600
+    # Minimum seconds between forced refetches (see refresh_for_kid), so
+    # tokens with made-up key ids can't make every callback hit Google
+    _MIN_REFRESH_INTERVAL = 60
+    _MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+    def __init__(self):
+        super().__init__(session=_GOOGLE_SESSION)
+        self._responses = LRUCache(max_size=4, default_ttl=self._DEFAULT_TTL)
+        self._last_refresh = 0.0
+
+    def __call__(self, url, method="GET", **kwargs):
+        if method != "GET":
+            return super().__call__(url, method=method, **kwargs)
+        response = self._responses.get(url)
+        if response is None:
+            response = super().__call__(url, method=method, **kwargs)
+            ttl = self._ttl(response)
+            if response.status == 200 and ttl > 0:
+                self._responses.set(url, response, ttl=ttl)
+        return response
+
+    @classmethod
+    def _ttl(cls, response):
+        """Seconds the response stays fresh: max-age minus Age, if given."""
+        headers = response.headers or {}
+        match = cls._MAX_AGE_RE.search(headers.get("Cache-Control", ""))
+        if match is None:
+            return cls._DEFAULT_TTL
+        try:
+            age = int(headers.get("Age", 0))
+        except ValueError:
+            age = 0
+        return int(match.group(1)) - age
+
+    def refresh_for_kid(self, raw_token):
+        """
+        Drop the cached certs if raw_token's key id is not among them.
+
+        Returns True when the caller should verify again: Google has
+        rotated its keys since the certs were cached.
+        """
+        try:
+            kid = jwt.get_unverified_header(raw_token).get("kid")
+        except jwt.InvalidTokenError:
+            return False
+        if kid is None or self._has_cert(kid):
+            return False
+        now = time.monotonic()
+        if now - self._last_refresh < self._MIN_REFRESH_INTERVAL:
+            return False
+        self._last_refresh = now
+        self._responses.clear()
+        return True
+
+    def _has_cert(self, kid):
+        certs = self._responses.get(_GOOGLE_CERTS_URL)
+        if certs is None:
+            return False
+        try:
+            return kid in json.loads(certs.data)
+        except ValueError:
+            return False
+
+
+_GOOGLE_CERTS_REQUEST = _CachedGoogleRequest()
+
+# SQL text shared by the handlers. sqlite3's statement cache is keyed on the
+# exact text, so every call site of a query must use the same string.
+_SQL_INSERT_USER: Final = (
+    "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?) "
+    "ON CONFLICT DO NOTHING RETURNING id"
+)
+# 1 = username taken, 2 = email taken
+_SQL_SIGNUP_COLLISION: Final = (
+    "SELECT 1 FROM users WHERE username = ? "
+    "UNION ALL SELECT 2 FROM users WHERE email = ? LIMIT 1"
+)
+_SQL_LOGIN_SELECT: Final = "SELECT username, email, password_hash FROM users WHERE username = ?"
+_SQL_GET_HASH: Final = "SELECT password_hash FROM users WHERE username = ?"
+# Replace a password hash only if it is still the one that was verified
+_SQL_SWAP_HASH: Final = "UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?"
+_SQL_UPDATE_EMAIL: Final = "UPDATE users SET email = ? WHERE username = ?"
+_SQL_USER_COLUMNS: Final = "PRAGMA table_info(users)"
+# SQLite's message for a duplicate username, compared whole instead of
+# substring-searching str(e)
+_USERNAME_TAKEN: Final = "UNIQUE constraint failed: users.username"
+# Usernames equal to a base name or the base followed by digits
+_SQL_SUFFIXED_USERNAMES: Final = "SELECT username FROM users WHERE username = ? OR username GLOB ?"
+
+# Brute-force limits for password endpoints: every attempt counts per
+# client IP, while only failed attempts count per account, so successful
+# logins never use up an account's quota
+_IP_LIMITS = (RateLimiter(10, 60), RateLimiter(100, 3600))
+_ACCOUNT_FAILURE_LIMITS = (RateLimiter(5, 60), RateLimiter(50, 3600))
+
+
+# Identifier fields lose surrounding whitespace; passwords are taken verbatim
+_STRIPPED_FIELDS: Final = frozenset(("username", "email"))
+
+
+def _body_fields(*fields):
+    """
+    Read string fields from the JSON body in one pass.
+
+    Missing or non-string values come back as "" so the handlers'
+    required-field checks reject them (instead of a 500 on .strip()).
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        raise APIError("No JSON data provided")
+    values = []
+    for field in fields:
+        value = data.get(field)
+        if not isinstance(value, str):
+            value = ""
+        elif field in _STRIPPED_FIELDS:
+            value = value.strip()
+        values.append(value)
+    return values
+
+
+def _client_ip():
+    """Rate-limit key of the client address (ProxyFix resolves it behind Render)."""
+    return request.remote_addr or ""
+
+
+def _body_field_key(field):
+    """Rate-limit key of a JSON body field (body parse is cached)."""
+    def key_func():
+        data = request.get_json(silent=True)
+        value = data.get(field) if isinstance(data, dict) else None
+        if not isinstance(value, str):
+            value = ""
+        return value.strip()
+    return key_func
+
+
+def _auth_user_key():
+    """Rate-limit key of the user set by require_auth."""
+    return g.get('auth_username') or ""
 
 
 @app.route("/api/signup", methods=["POST"])
 def signup():
     try:
-        data = request.get_json()
-        if not data:
-            raise APIError("No JSON data provided")
-
-        username = data.get("username", "").strip()
-        email = data.get("email", "").strip()
-        password = data.get("password", "")
+        username, email, password = _body_fields("username", "email", "password")
 
         if not all([username, email, password]):
             raise APIError("Missing required fields: username, email, password")
@@ -28,22 +201,31 @@ def signup():
         if len(password) < 6:
             raise APIError("Password must be at least 6 characters long")
 
+        # Hash before taking a pooled connection so the KDF doesn't hold it
+        password_hash = hash_password(password)
+
         with get_connection() as conn:
-            cursor = conn.cursor()
-            try:
-                cursor.execute(
-                    "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
-                    (username, email, hash_password(password))
-                )
-                conn.commit()
-            except sqlite3.IntegrityError as e:
-                if "username" in str(e):
+            # DO NOTHING on a UNIQUE collision: no row comes back instead of
+            # an IntegrityError whose message would have to be parsed.
+            inserted = conn.execute(
+                _SQL_INSERT_USER,
+                (username, email, password_hash)
+            ).fetchone()
+
+            if inserted is None:
+                collision = conn.execute(
+                    _SQL_SIGNUP_COLLISION,
+                    (username, email)
+                ).fetchone()
+                if collision and collision[0] == 1:
                     raise APIError("Username already exists")
-                elif "email" in str(e):
+                elif collision and collision[0] == 2:
                     raise APIError("Email already exists")
                 else:
                     raise APIError("User already exists")
 
+            conn.commit()
+
         logger.info(f"New user registered: {username}")
         return jsonify({
             'message': 'Registration successful!',
@@ -58,28 +240,38 @@ def signup():
 
 
 @app.route("/api/login", methods=["POST"])
+@rate_limit(*_IP_LIMITS, key_func=_client_ip)
+@limit_failures(*_ACCOUNT_FAILURE_LIMITS, key_func=_body_field_key("username"))
 def login():
     try:
-        data = request.get_json()
-        if not data:
-            raise APIError("No JSON data provided")
-
-        username = data.get("username", "").strip()
-        password = data.get("password", "")
+        username, password = _body_fields("username", "password")
 
         if not username or not password:
             raise APIError("Username and password required")
 
+        # Fetch by username and verify in Python: Argon2 hashes are salted,
+        # and the comparison stays constant-time instead of an SQL equality probe.
         with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT username, email FROM users WHERE username = ? AND password_hash = ?",
-                (username, hash_password(password))
-            )
-            user = cursor.fetchone()
+            user = conn.execute(
+                _SQL_LOGIN_SELECT,
+                (username,)
+            ).fetchone()
+
+        # The KDF runs with no pooled connection held. An unknown username
+        # still goes through verify_password (dummy hash) so it takes as
+        # long as a wrong password.
+        verified = verify_password(user['password_hash'] if user else None, password)
+        if verified and password_needs_rehash(user['password_hash']):
+            # Lazily migrate legacy SHA256 / outdated Argon2 hashes
+            upgraded_hash = hash_password(password)
+            with get_connection() as conn:
+                conn.execute(
+                    _SQL_SWAP_HASH,
+                    (upgraded_hash, user['username'], user['password_hash'])
+                )
+                conn.commit()
 
-        if user:
-            from flask import session
+        if verified:
             session.permanent = True  # Make session persist across browser restarts
             session['username'] = user['username']
             session['email'] = user['email']
@@ -112,21 +304,17 @@ def login():
 @app.route("/api/logout", methods=["POST"])
 @require_auth()
 def logout():
-    from flask import session
-    username = session.get('username')
+    username = g.auth_username
     session.clear()
     logger.info(f"User logged out: {username}")
     return jsonify({'message': 'Logout successful!'})
 
 
 @app.route("/api/forgot-password", methods=["POST"])
+@rate_limit(*_IP_LIMITS, key_func=_client_ip)
 def forgot_password():
     try:
-        data = request.get_json()
-        if not data:
-            raise APIError("No JSON data provided")
-
-        email = data.get("email", "").strip()
+        email = _body_fields("email")[0]
 
         if not email:
             raise APIError("Email is required")
@@ -144,28 +332,36 @@ def forgot_password():
         raise APIError("Failed to process password reset request")
 
 
+# JSON body of check_auth for anonymous visitors. Only the bytes are shared:
+# each request still gets its own Response, since CORS and session hooks
+# add headers to it.
+_LOGGED_OUT_BODY = (json.dumps(
+    {'logged_in': False, 'username': None, 'email': None},
+    separators=(",", ":"), sort_keys=True  # same bytes as jsonify
+) + "\n").encode()
+
+
 @app.route("/api/auth/check", methods=["GET"])
 def check_auth():
     """Check if user is authenticated and return user info"""
     try:
-        from flask import session, request
         username = session.get('username')
         email = session.get('email')
 
         # If no session, try JWT from Authorization header
         if not username:
             auth_header = request.headers.get("Authorization", "")
-            if auth_header.startswith("Bearer "):
-                token = auth_header.split(" ", 1)[1].strip()
-                try:
-                    from utils.jwt_utils import verify_jwt
-                    import jwt
-                    payload = verify_jwt(token)
-                    username = payload.get("username")
-                    email = payload.get("email")
-                except jwt.PyJWTError:
-                    username = None
-                    email = None
+            if not auth_header.startswith("Bearer "):
+                # Logged out, the most frequent poll: serve the pre-encoded body
+                return app.response_class(_LOGGED_OUT_BODY, status=200, mimetype="application/json")
+            token = auth_header.split(" ", 1)[1].strip()
+            try:
+                payload = verify_jwt_cached(token)
+                username = payload.get("username")
+                email = payload.get("email")
+            except jwt.PyJWTError:
+                username = None
+                email = None
 
         if username:
             return jsonify({
@@ -174,11 +370,7 @@ def check_auth():
                 'email': email
             }), 200
         else:
-            return jsonify({
-                'logged_in': False,
-                'username': None,
-                'email': None
-            }), 200
+            return app.response_class(_LOGGED_OUT_BODY, status=200, mimetype="application/json")
 
     except APIError:
         raise
@@ -192,34 +384,31 @@ def check_auth():
 def update_email():
     """Update user's email address"""
     try:
-        from flask import session
-        data = request.get_json()
-        if not data:
-            raise APIError("No JSON data provided")
-
-        new_email = data.get("email", "").strip()
+        new_email = _body_fields("email")[0]
 
         if not new_email:
             raise APIError("Email is required")
 
-        username = session.get('username')
+        username = g.auth_username
 
         with get_connection() as conn:
-            cursor = conn.cursor()
             try:
-                cursor.execute(
-                    "UPDATE users SET email = ? WHERE username = ?",
+                conn.execute(
+                    _SQL_UPDATE_EMAIL,
                     (new_email, username)
                 )
                 conn.commit()
             except sqlite3.IntegrityError:
                 raise APIError("Email already exists")
 
-        session['email'] = new_email
+        if 'username' in session:
+            session['email'] = new_email
         logger.info(f"Email updated for user: {username}")
         return jsonify({
             'message': 'Email updated successfully',
-            'email': new_email
+            'email': new_email,
+            # Fresh token so JWT clients stop carrying the old email
+            'token': create_jwt({"username": username, "email": new_email})
         })
 
     except APIError:
@@ -231,16 +420,12 @@ def update_email():
 
 @app.route("/api/auth/change-password", methods=["POST"])
 @require_auth()
+@rate_limit(*_IP_LIMITS, key_func=_client_ip)
+@limit_failures(*_ACCOUNT_FAILURE_LIMITS, key_func=_auth_user_key)
 def change_password():
     """Change user's password"""
     try:
-        from flask import session
-        data = request.get_json()
-        if not data:
-            raise APIError("No JSON data provided")
-
-        current_password = data.get("current_password", "")
-        new_password = data.get("new_password", "")
+        current_password, new_password = _body_fields("current_password", "new_password")
 
         if not current_password or not new_password:
             raise APIError("Current password and new password are required")
@@ -248,28 +433,33 @@ def change_password():
         if len(new_password) < 6:
             raise APIError("New password must be at least 6 characters long")
 
-        username = session.get('username')
+        username = g.auth_username
 
         with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT password_hash FROM users WHERE username = ?",
+            user = conn.execute(
+                _SQL_GET_HASH,
                 (username,)
-            )
-            user = cursor.fetchone()
+            ).fetchone()
+
+        if not user:
+            raise APIError("User not found", 404)
 
-            if not user:
-                raise APIError("User not found", 404)
+        # Verify current password (salted hashes can't be matched in SQL).
+        # Both KDF calls run with no pooled connection held, and the new
+        # password is only hashed once the current one checks out.
+        if not verify_password(user['password_hash'], current_password):
+            raise APIError("Current password is incorrect", 401)
 
-            # Verify current password
-            if user['password_hash'] != hash_password(current_password):
-                raise APIError("Current password is incorrect", 401)
+        new_hash = hash_password(new_password)
 
-            # Update password
-            cursor.execute(
-                "UPDATE users SET password_hash = ? WHERE username = ?",
-                (hash_password(new_password), username)
+        with get_connection() as conn:
+            # Update only if the hash is still the one just verified
+            cursor = conn.execute(
+                _SQL_SWAP_HASH,
+                (new_hash, username, user['password_hash'])
             )
+            if cursor.rowcount == 0:
+                raise APIError("Password was changed concurrently, please retry", 409)
             conn.commit()
 
         logger.info(f"Password changed for user: {username}")
@@ -285,29 +475,125 @@ def change_password():
 
 # ============ GOOGLE OAUTH 2.0 ROUTES ============
 
+# OAuth client configuration, read once (load_dotenv already ran in app_init)
+GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID")
+GOOGLE_CLIENT_SECRET = os.environ.get("GOOGLE_CLIENT_SECRET")
+GOOGLE_REDIRECT_URI = os.environ.get("GOOGLE_REDIRECT_URI")
+GOOGLE_CONFIGURED = all([GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI])
+if not GOOGLE_CONFIGURED:
+    logger.warning("Google OAuth is not configured; /api/auth/google/* will return 500")
+
+
+def _verify_google_id_token(raw_id_token):
+    """Verify a Google ID token, refetching the certs once if its key is new."""
+    try:
+        return id_token.verify_oauth2_token(
+            raw_id_token, _GOOGLE_CERTS_REQUEST, GOOGLE_CLIENT_ID, clock_skew_in_seconds=10
+        )
+    except ValueError:
+        # Signed with a key rotated in after the certs were cached
+        if not _GOOGLE_CERTS_REQUEST.refresh_for_kid(raw_id_token):
+            raise
+        return id_token.verify_oauth2_token(
+            raw_id_token, _GOOGLE_CERTS_REQUEST, GOOGLE_CLIENT_ID, clock_skew_in_seconds=10
+        )
+
+
+# Optional users columns, probed once: init_db has finished any migration
+# before requests arrive, so the schema is fixed for the process lifetime
+UsersSchema = namedtuple("UsersSchema", "has_google_id has_provider has_password_hash")
+_users_schema = None
+_schema_lock = threading.Lock()
+
+
+def _get_users_schema(conn):
+    """Which optional users columns exist, from PRAGMA table_info on first call."""
+    global _users_schema
+    if _users_schema is None:
+        with _schema_lock:
+            if _users_schema is None:
+                columns = {col[1] for col in conn.execute(_SQL_USER_COLUMNS)}
+                _users_schema = UsersSchema(
+                    has_google_id="google_id" in columns,
+                    has_provider="provider" in columns,
+                    has_password_hash="password_hash" in columns,
+                )
+    return _users_schema
+
+
+# Frontend redirect prefixes (FRONTEND_URL is fixed at import)
+_LOGIN_ERROR_URL = f"{FRONTEND_URL}/login?error="
+_HOME_PREFIX = f"{FRONTEND_URL}/home?"
+
+# Consent-screen URL: every parameter is a process constant, so encode it once
+# (None when OAuth isn't configured)
+_GOOGLE_AUTH_URL = (
+    "https://accounts.google.com/o/oauth2/v2/auth?" + urlencode({
+        "client_id": GOOGLE_CLIENT_ID,
+        "redirect_uri": GOOGLE_REDIRECT_URI,
+        "response_type": "code",
+        "scope": "openid email profile",
+        "access_type": "offline"
+    })
+    if GOOGLE_CONFIGURED else None
+)
+
+
+@lru_cache(maxsize=None)
+def _google_upsert_sql(schema):
+    """
+    Create-or-refresh statement for a Google sign-in, built once per schema.
+
+    A new email inserts (username, email, optional columns); an existing
+    email only refreshes google_id/provider (never password_hash).
+    """
+    columns = ["username", "email"]
+    update_fields = []
+    if schema.has_password_hash:
+        columns.append("password_hash")
+    if schema.has_google_id:
+        columns.append("google_id")
+        update_fields.append("google_id = excluded.google_id")
+    if schema.has_provider:
+        columns.append("provider")
+        update_fields.append("provider = excluded.provider")
+    # DO UPDATE (even a no-op one) so RETURNING yields the existing row
+    update_clause = ", ".join(update_fields) or "email = excluded.email"
+    return (
+        f"INSERT INTO users ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT(email) DO UPDATE SET {update_clause} "
+        "RETURNING username, email"
+    )
+
+
+def _free_username_suffix(conn, base_username):
+    """Smallest n >= 1 such that base_username + str(n) is not taken."""
+    # Escape GLOB metacharacters so the base name matches literally
+    pattern = "".join(
+        f"[{ch}]" if ch in "*?[" else ch for ch in base_username
+    ) + "[0-9]*"
+    base_len = len(base_username)
+    taken = set()
+    for row in conn.execute(_SQL_SUFFIXED_USERNAMES, (base_username, pattern)):
+        rest = row[0][base_len:]
+        if rest.isdigit() and rest[0] != "0":
+            taken.add(int(rest))
+    suffix = 1
+    while suffix in taken:
+        suffix += 1
+    return suffix
+
+
 @app.route("/api/auth/google/login", methods=["GET"])
 def google_login():
     """Redirect to Google OAuth consent screen"""
     try:
-        client_id = os.environ.get("GOOGLE_CLIENT_ID")
-        redirect_uri = os.environ.get("GOOGLE_REDIRECT_URI")
-        
-        if not client_id or not redirect_uri:
+        if _GOOGLE_AUTH_URL is None:
             raise APIError("Google OAuth not configured", 500)
         
-        # Build Google OAuth URL
-        params = {
-            "client_id": client_id,
-            "redirect_uri": redirect_uri,
-            "response_type": "code",
-            "scope": "openid email profile",
-            "access_type": "offline"
-        }
-        
-        google_auth_url = f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(params)}"
         logger.info("Redirecting user to Google OAuth consent screen")
         
-        return redirect(google_auth_url)
+        return redirect(_GOOGLE_AUTH_URL)
     
     except APIError:
         raise
@@ -325,29 +611,25 @@ def google_callback():
         
         if error:
             logger.warning(f"Google OAuth error: {error}")
-            return redirect(f"{FRONTEND_URL}/login?error={error}")
+            return redirect(_LOGIN_ERROR_URL + error)
         
         if not code:
             raise APIError("Authorization code not received", 400)
         
         # Exchange code for token
-        client_id = os.environ.get("GOOGLE_CLIENT_ID")
-        client_secret = os.environ.get("GOOGLE_CLIENT_SECRET")
-        redirect_uri = os.environ.get("GOOGLE_REDIRECT_URI")
-        
-        if not all([client_id, client_secret, redirect_uri]):
+        if not GOOGLE_CONFIGURED:
             raise APIError("Google OAuth not properly configured", 500)
         
-        token_response = requests.post(
+        token_response = _GOOGLE_SESSION.post(
             "https://oauth2.googleapis.com/token",
             data={
-                "client_id": client_id,
-                "client_secret": client_secret,
+                "client_id": GOOGLE_CLIENT_ID,
+                "client_secret": GOOGLE_CLIENT_SECRET,
                 "code": code,
                 "grant_type": "authorization_code",
-                "redirect_uri": redirect_uri
+                "redirect_uri": GOOGLE_REDIRECT_URI
             },
-            timeout=10
+            timeout=_GOOGLE_TIMEOUT
         )
         
         if token_response.status_code != 200:
@@ -355,118 +637,70 @@ def google_callback():
             raise Exception("Failed to exchange authorization code")
         
         tokens = token_response.json()
-        access_token = tokens.get("access_token")
+        raw_id_token = tokens.get("id_token")
         
-        if not access_token:
-            raise Exception("No access token received")
+        if not raw_id_token:
+            raise Exception("No ID token received")
         
-        # Fetch user info from Google
-        userinfo_response = requests.get(
-            "https://www.googleapis.com/oauth2/v3/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"},
-            timeout=10
-        )
-        
-        if userinfo_response.status_code != 200:
-            logger.error(f"Failed to fetch Google user info: {userinfo_response.text}")
-            raise Exception("Failed to fetch Google user info")
-        
-        userinfo = userinfo_response.json()
+        # The openid scope returns a signed ID token with the profile claims:
+        # verify it locally instead of a second round trip to /userinfo
+        userinfo = _verify_google_id_token(raw_id_token)
         
         # Extract user info
-        google_id = userinfo.get("sub") or userinfo.get("id")
+        google_id = userinfo.get("sub")
         email = userinfo.get("email")
         name = userinfo.get("name")
         
         if not email:
-            raise Exception("Missing required email from Google user info")
+            raise Exception("Missing required email in Google ID token")
         
         logger.info(f"Google OAuth successful for email: {email}")
         
-        # Check if user exists
+        # Create or update the user in one statement per attempt
         with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(users)")
-            columns = {col[1] for col in cursor.fetchall()}
-            has_google_id = "google_id" in columns
-            has_provider = "provider" in columns
-            has_password_hash = "password_hash" in columns
-            
-            cursor.execute(
-                "SELECT id, username, email FROM users WHERE email = ?",
-                (email,)
+            schema = _get_users_schema(conn)
+
+            # Use email local-part as base username to avoid collisions when
+            # multiple Google accounts share the same full name.
+            base_username = (email.split('@')[0] or "user").strip()
+            if not base_username:
+                base_username = "user"
+
+            upsert_sql = _google_upsert_sql(schema)
+            # Values for the optional columns, in the order the SQL lists
+            # them; fixed across retries, only the username changes
+            static_values = (
+                (None,) * schema.has_password_hash
+                + (google_id,) * schema.has_google_id
+                + ("google",) * schema.has_provider
             )
-            
-            user = cursor.fetchone()
-            
-            if user:
-                # Existing user
-                username = user['username'] or email.split('@')[0]
-                user_email = user['email']
-                logger.info(f"Existing Google user logged in: {email}")
-                
-                update_fields = []
-                params = []
-                if has_google_id and google_id:
-                    update_fields.append("google_id = ?")
-                    params.append(google_id)
-                if has_provider:
-                    update_fields.append("provider = ?")
-                    params.append("google")
-                if update_fields:
-                    params.append(user_email)
-                    cursor.execute(
-                        f"UPDATE users SET {', '.join(update_fields)} WHERE email = ?",
-                        tuple(params)
-                    )
+
+            # An existing email updates that row; a new email inserts with a
+            # unique username. On a username conflict the smallest free
+            # numeric suffix is looked up once; the loop only repeats if a
+            # concurrent signup takes that name first.
+            candidate = base_username
+            suffix = 0
+            while True:
+                try:
+                    user = conn.execute(
+                        upsert_sql, (candidate, email, *static_values)
+                    ).fetchone()
                     conn.commit()
-            else:
-                # New user - create account
-                # Use email local-part as base username to avoid collisions when
-                # multiple Google accounts share the same full name.
-                base_username = (email.split('@')[0] or "user").strip()
-                if not base_username:
-                    base_username = "user"
-
-                user_email = email
-
-                columns_to_insert = ["username", "email"]
-
-                # Static columns that don't change across collision retries
-                static_columns = []
-                static_values = []
-                if has_password_hash:
-                    static_columns.append("password_hash")
-                    static_values.append(None)
-                if has_google_id and google_id:
-                    static_columns.append("google_id")
-                    static_values.append(google_id)
-                if has_provider:
-                    static_columns.append("provider")
-                    static_values.append("google")
-
-                # Try to insert with unique username, appending a numeric suffix on conflict
-                suffix = 0
-                while True:
-                    username = base_username if suffix == 0 else f"{base_username}{suffix}"
-                    try:
-                        cols = columns_to_insert + static_columns
-                        values = [username, user_email] + static_values
-                        placeholders = ", ".join(["?"] * len(cols))
-                        cursor.execute(
-                            f"INSERT INTO users ({', '.join(cols)}) VALUES ({placeholders})",
-                            tuple(values)
-                        )
-                        conn.commit()
-                        logger.info(f"New Google user created: {email} with username {username}")
-                        break
-                    except sqlite3.IntegrityError as e:
-                        # Username collision -> try next suffix
-                        if "username" in str(e):
-                            suffix += 1
-                            continue
-                        # Any other integrity error is unexpected; re-raise
+                    break
+                except sqlite3.IntegrityError as e:
+                    # Any other integrity error is unexpected; re-raise
+                    if e.args[0] != _USERNAME_TAKEN:
                         raise
+                    if suffix == 0:
+                        suffix = _free_username_suffix(conn, base_username)
+                    else:
+                        suffix += 1
+                    candidate = f"{base_username}{suffix}"
+
+            username = user['username'] or base_username
+            user_email = user['email']
+            logger.info(f"Google user signed in: {email} with username {username}")
         
         # Set session
         session.permanent = True  # Make session persist across browser restarts
@@ -480,11 +714,11 @@ def google_callback():
         })
 
         # Redirect to frontend with token & username in query params
-        redirect_url = f"{FRONTEND_URL}/home?token={quote(token)}&username={quote(username)}"
+        redirect_url = _HOME_PREFIX + urlencode({"token": token, "username": username})
         
         logger.info(f"Google OAuth user logged in, redirecting to {redirect_url}")
         return redirect(redirect_url)
     
     except Exception as e:
         logger.exception("Google callback error")
-        return redirect(f"{FRONTEND_URL}/login?error=oauth_failed")
\ No newline at end of file
+        return redirect(_LOGIN_ERROR_URL + "oauth_failed")
\ No newline at end of file
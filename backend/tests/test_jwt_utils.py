@@ -0,0 +1,85 @@
+"""
+Tests for the JWT verification cache (utils/jwt_utils.py)
+"""
+
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+import pytest
+
+from utils import jwt_utils
+from utils.jwt_utils import create_jwt, verify_jwt_cached, VERIFY_CACHE_TTL
+
+
+def _token(exp_in: float, secret: str = None) -> str:
+    now = int(time.time())
+    payload = {"username": "bob", "email": "b@x", "iat": now, "exp": now + exp_in}
+    return jwt.encode(payload, secret or jwt_utils.JWT_SECRET, algorithm=jwt_utils.JWT_ALGORITHM)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    jwt_utils._verified_tokens.clear()
+    yield
+    jwt_utils._verified_tokens.clear()
+
+
+def test_repeat_token_is_served_from_cache(monkeypatch):
+    """Only the first verification of a token decodes it"""
+    token = create_jwt({"username": "bob", "email": "b@x"})
+    calls = []
+    real_verify = jwt_utils.verify_jwt
+
+    def counting_verify(t):
+        calls.append(t)
+        return real_verify(t)
+
+    monkeypatch.setattr(jwt_utils, "verify_jwt", counting_verify)
+
+    first = verify_jwt_cached(token)
+    second = verify_jwt_cached(token)
+
+    assert first == second
+    assert first["username"] == "bob"
+    assert len(calls) == 1
+
+
+def test_cache_entry_never_outlives_exp():
+    """A long-lived token is cached for VERIFY_CACHE_TTL, a short-lived one until exp"""
+    long_lived = _token(exp_in=3600)
+    short_lived = _token(exp_in=2)
+
+    long_payload = verify_jwt_cached(long_lived)
+    short_payload = verify_jwt_cached(short_lived)
+    entries = jwt_utils._verified_tokens._cache
+    # CacheEntry re-reads the clock, so allow a little scheduling slack
+    slack = 0.01
+
+    assert entries[long_lived].expires_at <= time.time() + VERIFY_CACHE_TTL + slack
+    assert entries[long_lived].expires_at <= long_payload["exp"]
+    assert entries[short_lived].expires_at <= short_payload["exp"] + slack
+
+
+def test_failed_verification_is_not_cached():
+    """Bad signatures raise every time and leave nothing behind"""
+    forged = _token(exp_in=3600, secret="not-the-secret-used-to-sign-our-tokens")
+
+    for _ in range(2):
+        with pytest.raises(jwt.InvalidSignatureError):
+            verify_jwt_cached(forged)
+    assert forged not in jwt_utils._verified_tokens._cache
+
+
+def test_expired_token_rejected_after_being_cached():
+    """Once exp passes, the cached payload is gone and decoding rejects the token"""
+    token = _token(exp_in=1)
+    assert verify_jwt_cached(token)["username"] == "bob"
+
+    exp = jwt.decode(token, options={"verify_signature": False})["exp"]
+    time.sleep(max(0.0, exp - time.time()) + 0.05)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verify_jwt_cached(token)
@@ -0,0 +1,69 @@
+"""
+Tests for the lemma cache behind lemmatize_tokens (utils/preprocessing.py)
+
+spaCy is replaced by a small lookup table so the cache-overflow paths can
+be exercised with a tiny LEMMA_CACHE_MAX_SIZE.
+"""
+
+import sys
+import os
+from collections import OrderedDict
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from utils import preprocessing
+from utils.preprocessing import lemmatize_tokens
+
+
+LEMMAS = {"running": "run", "dogs": "dog", "geese": "goose", "stocks": "stock"}
+
+
+@pytest.fixture
+def fake_spacy(monkeypatch):
+    """Lemmatize through LEMMAS with an empty cache; yields the words sent to spaCy"""
+    calls = []
+
+    def spacy_lemmas(words):
+        calls.append(list(words))
+        return [LEMMAS.get(word, word) for word in words]
+
+    monkeypatch.setattr(preprocessing, "_get_nlp", lambda: object())
+    monkeypatch.setattr(preprocessing, "_spacy_lemmas", spacy_lemmas)
+    monkeypatch.setattr(preprocessing, "_LEMMA_CACHE", OrderedDict())
+    return calls
+
+
+def test_cached_tokens_skip_spacy(fake_spacy):
+    """Only tokens missing from the cache go through spaCy"""
+    assert lemmatize_tokens(["running", "dogs"]) == ["run", "dog"]
+    assert lemmatize_tokens(["dogs", "geese", "dogs"]) == ["dog", "goose", "dog"]
+    assert fake_spacy == [["running", "dogs"], ["geese"]]
+
+
+def test_cache_overflow_keeps_batch_lemmas(fake_spacy, monkeypatch):
+    """Evicting from a full cache mid-batch still lemmatizes the batch's cached tokens"""
+    monkeypatch.setattr(preprocessing, "LEMMA_CACHE_MAX_SIZE", 3)
+    lemmatize_tokens(["running", "dogs"])
+
+    assert lemmatize_tokens(["running", "dogs", "geese", "stocks"]) == ["run", "dog", "goose", "stock"]
+    assert len(preprocessing._LEMMA_CACHE) == 3
+
+
+def test_least_recently_used_evicted(fake_spacy, monkeypatch):
+    """Past the cap only the least recently used tokens leave the cache"""
+    monkeypatch.setattr(preprocessing, "LEMMA_CACHE_MAX_SIZE", 2)
+    lemmatize_tokens(["running", "dogs"])
+    lemmatize_tokens(["running"])  # "dogs" is now the oldest
+    lemmatize_tokens(["geese"])
+
+    assert list(preprocessing._LEMMA_CACHE) == ["running", "geese"]
+
+
+def test_batch_larger_than_cache(fake_spacy, monkeypatch):
+    """A batch with more distinct tokens than the cap is still fully lemmatized"""
+    monkeypatch.setattr(preprocessing, "LEMMA_CACHE_MAX_SIZE", 2)
+
+    assert lemmatize_tokens(["running", "dogs", "geese"]) == ["run", "dog", "goose"]
+    assert preprocessing._lemmatize_rows([["geese"], ["dogs", "stocks"]]) == [["goose"], ["dog", "stock"]]
+    assert len(preprocessing._LEMMA_CACHE) <= 2
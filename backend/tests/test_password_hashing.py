@@ -0,0 +1,36 @@
+"""
+Tests for password hashing and verification (utils/database.py)
+
+Covers both stored formats: Argon2id hashes written by hash_password and
+legacy unsalted SHA256 hex digests from older accounts.
+"""
+
+import hashlib
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import hash_password, verify_password, password_needs_rehash
+
+
+def test_round_trip():
+    """A freshly hashed password verifies; a wrong one does not"""
+    stored = hash_password("correct horse")
+    assert verify_password(stored, "correct horse")
+    assert not verify_password(stored, "correct horsE")
+    assert not password_needs_rehash(stored)
+    assert stored.startswith("$argon2id$")
+
+
+def test_legacy_sha256_hash():
+    """Legacy SHA256 digests still verify and are flagged for migration"""
+    legacy = hashlib.sha256(b"oldpass").hexdigest()
+    assert verify_password(legacy, "oldpass")
+    assert not verify_password(legacy, "oldpass2")
+    assert password_needs_rehash(legacy)
+
+
+def test_missing_hash_never_matches():
+    """Google-only accounts have no password hash"""
+    assert not verify_password(None, "")
+    assert not verify_password("", "anything")
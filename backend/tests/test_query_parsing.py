@@ -0,0 +1,49 @@
+"""
+Tests for sector detection in parse_query_filters (utils/preprocessing.py)
+
+Sector keywords match whole query words (hyphenated terms included), with
+multi-word keywords as a fallback; the first sector word in the query wins.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import preprocessing
+from utils.preprocessing import parse_query_filters
+
+
+def sector_of(query):
+    return parse_query_filters(query)["sector"]
+
+
+def test_whole_word_matches():
+    """Keywords match whole words, not substrings of longer words"""
+    assert sector_of("tech stocks") == "Technology"
+    assert sector_of("Show me IT sector stocks rising") == "Technology"
+    assert sector_of("e-commerce stocks") == "Retail"
+
+    assert sector_of("pharmaceuticals stocks") == ""
+    assert sector_of("technological stocks") == ""
+    assert sector_of("editor picks") == ""  # contains "it"
+
+
+def test_multi_word_keywords(monkeypatch):
+    """Multi-word keywords match when no single query word is a keyword"""
+    assert sector_of("real estate companies") == "Realty"
+
+    monkeypatch.setattr(
+        preprocessing, "_MULTIWORD_SECTOR_KEYWORDS", [("clean air", "Energy")]
+    )
+    assert sector_of("clean air stocks") == "Energy"
+    assert sector_of("clean stocks") == ""
+
+
+def test_which_sector_wins():
+    """The first sector word in the query wins; shared keywords go to the earlier sector"""
+    assert sector_of("bank and oil stocks") == "Financial Services"
+    assert sector_of("oil and bank stocks") == "Energy"
+
+    # "pharma" is listed under healthcare and chemical, "consumer" under retail and consumer
+    assert sector_of("pharma stocks") == "Healthcare"
+    assert sector_of("consumer stocks") == "Retail"
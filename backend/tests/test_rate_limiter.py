@@ -0,0 +1,149 @@
+"""
+Tests for the sliding-window rate limiter (utils/rate_limiter.py) and the
+rate_limit decorator (errors.py)
+"""
+
+import logging
+import sys
+import os
+import types
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+# errors.py registers its handlers on app_init.app; a bare app keeps these
+# tests from starting the whole service (DB init, refresh threads, ...)
+if "app_init" not in sys.modules:
+    _app_init = types.ModuleType("app_init")
+    _app_init.app = Flask(__name__)
+    _app_init.logger = logging.getLogger("app_init")
+    sys.modules["app_init"] = _app_init
+
+import app_init
+from errors import APIError, handle_api_error, limit_failures, rate_limit
+from utils import rate_limiter
+from utils.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def _use_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def test_limit_then_window_slides(monkeypatch):
+    """Hits past the limit are refused until the oldest ones leave the window"""
+    clock = _use_clock(monkeypatch)
+    limiter = RateLimiter(limit=2, window_seconds=60)
+
+    assert limiter.hit("ip:bob")
+    clock.now += 30
+    assert limiter.hit("ip:bob")
+    assert not limiter.hit("ip:bob")
+
+    # First hit expires at +60, the second one is still counted
+    clock.now += 30
+    assert limiter.hit("ip:bob")
+    assert not limiter.hit("ip:bob")
+
+    limiter.reset("ip:bob")
+    assert limiter.hit("ip:bob")
+
+
+def test_keys_are_isolated(monkeypatch):
+    """One key running out of attempts doesn't affect another"""
+    _use_clock(monkeypatch)
+    limiter = RateLimiter(limit=1, window_seconds=60)
+
+    assert limiter.hit("ip:bob")
+    assert not limiter.hit("ip:bob")
+    assert limiter.hit("ip:alice")
+    assert limiter.hit("other-ip:bob")
+
+
+def test_least_recent_key_evicted_when_full(monkeypatch):
+    """Past max_keys the least recently seen key is forgotten"""
+    _use_clock(monkeypatch)
+    limiter = RateLimiter(limit=1, window_seconds=60, max_keys=2)
+
+    assert limiter.hit("a")
+    assert limiter.hit("b")
+    assert not limiter.hit("a")  # refreshes "a"; "b" is now the oldest
+    assert limiter.hit("c")      # evicts "b"
+
+    assert len(limiter._hits) == 2
+    assert limiter.hit("b")      # forgotten, so allowed again
+    assert not limiter.hit("c")
+
+
+def test_is_limited_records_nothing(monkeypatch):
+    """is_limited reports the key's state without using up an attempt"""
+    clock = _use_clock(monkeypatch)
+    limiter = RateLimiter(limit=1, window_seconds=60)
+
+    assert not limiter.is_limited("bob")
+    assert not limiter.is_limited("bob")
+    assert limiter.hit("bob")
+    assert limiter.is_limited("bob")
+
+    clock.now += 60
+    assert not limiter.is_limited("bob")
+
+
+def test_decorator_returns_429(monkeypatch):
+    """The view runs until any limiter refuses, then the client gets 429"""
+    _use_clock(monkeypatch)
+    app = app_init.app
+    calls = []
+
+    @app.route("/_test/rate-limited", methods=["POST"])
+    @rate_limit(RateLimiter(5, 60), RateLimiter(2, 3600), key_func=lambda: "ip:bob")
+    def rate_limited_view():
+        calls.append(1)
+        return {"ok": True}
+
+    client = app.test_client()
+    statuses = [client.post("/_test/rate-limited").status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+    assert len(calls) == 2
+    assert client.post("/_test/rate-limited").get_json()["error"]
+
+
+def test_failure_limit_ignores_successes(monkeypatch):
+    """Only failed attempts count toward limit_failures; successes are free"""
+    _use_clock(monkeypatch)
+    # Own app: routes can't be added to one that has already served requests
+    app = Flask(__name__)
+    app.register_error_handler(APIError, handle_api_error)
+    outcomes = []
+
+    @app.route("/_test/failure-limited", methods=["POST"])
+    @limit_failures(RateLimiter(2, 60), key_func=lambda: "bob")
+    def failure_limited_view():
+        if outcomes.pop(0):
+            return {"ok": True}
+        raise APIError("Invalid credentials", 401)
+
+    client = app.test_client()
+
+    outcomes.extend([True] * 5)
+    statuses = [client.post("/_test/failure-limited").status_code for _ in range(5)]
+    assert statuses == [200] * 5
+
+    outcomes.extend([False, False])
+    statuses = [client.post("/_test/failure-limited").status_code for _ in range(2)]
+    assert statuses == [401, 401]
+
+    # Locked after two failures: the view isn't even reached
+    outcomes.append(True)
+    assert client.post("/_test/failure-limited").status_code == 429
+    assert outcomes == [True]
@@ -0,0 +1,48 @@
+"""
+Flask JSON provider backed by orjson
+
+Drop-in for Flask's DefaultJSONProvider: request.get_json() and jsonify()
+both go through app.json, so every route gets orjson's faster encode/decode
+without call-site changes. Output matches the default provider's compact
+form; types orjson doesn't handle natively fall back to Flask's default().
+"""
+
+import logging
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider using orjson for dumps/loads.
+
+    COMPATIBILITY:
+    - datetime/date are passed through to Flask's default() (HTTP date format)
+    - Non-string dict keys are stringified like the stdlib encoder
+    - numpy scalars/arrays are serialized natively
+    - Pretty-printing (indent) still uses the stdlib encoder
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs.get("indent"):
+            return super().dumps(obj, **kwargs)
+        option = (
+            orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SERIALIZE_NUMPY
+        )
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
@@ -1,9 +1,12 @@
 import os
+import time
 import datetime
 from typing import Dict, Any
 
 import jwt
 
+from utils.cache_manager import LRUCache
+
 
 # JWT configuration
 JWT_SECRET = os.environ.get("JWT_SECRET_KEY") or os.environ.get(
@@ -12,6 +15,11 @@ JWT_SECRET = os.environ.get("JWT_SECRET_KEY") or os.environ.get(
 JWT_ALGORITHM = "HS256"
 JWT_EXP_SECONDS = int(os.environ.get("JWT_EXP_SECONDS", 60 * 60 * 24 * 7))  # 7 days
 
+# Recently verified tokens → payload. Clients resend the same token on every
+# request; a hit skips base64/HMAC/claims work. Failures are never cached.
+VERIFY_CACHE_TTL = 30  # seconds
+_verified_tokens = LRUCache(max_size=10000, default_ttl=VERIFY_CACHE_TTL)
+
 
 def create_jwt(payload: Dict[str, Any]) -> str:
     """
@@ -37,5 +45,21 @@ def verify_jwt(token: str) -> Dict[str, Any]:
     return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
 
 
-__all__ = ["create_jwt", "verify_jwt"]
+
+def verify_jwt_cached(token: str) -> Dict[str, Any]:
+    """
+    verify_jwt with a short-lived cache of successful verifications.
+    An entry never outlives the token's own exp claim.
+    Raises jwt.PyJWTError subclasses on failure.
+    """
+    payload = _verified_tokens.get(token)
+    if payload is None:
+        payload = verify_jwt(token)
+        remaining = payload.get("exp", 0) - time.time()
+        if remaining > 0:
+            _verified_tokens.set(token, payload, ttl=min(VERIFY_CACHE_TTL, remaining))
+    return payload
+
+
+__all__ = ["create_jwt", "verify_jwt", "verify_jwt_cached"]
 
@@ -10,8 +10,11 @@ FEATURES:
 """
 
 import logging
+import re
+import threading
 from typing import List, Dict, Any, Optional, Set
 from functools import lru_cache
+from collections import OrderedDict
 import hashlib
 
 logger = logging.getLogger(__name__)
@@ -32,18 +35,31 @@ except ImportError:
     PANDAS_AVAILABLE = False
 
 
+# Legal-form words dropped from company names
+_NAME_STOPWORDS = frozenset(['inc', 'corp', 'corporation', 'company', 'co', 'ltd', 'limited', 'the'])
+
+
+def _dedupe(tokens: List[str], seen: Set[str]) -> List[str]:
+    """Remove duplicates while preserving order (seen is a reusable scratch set)"""
+    seen.clear()
+    return [token for token in tokens if not (token in seen or seen.add(token))]
+
+
 class OptimizedTokenizer:
     """
-    Optimized stock tokenizer with caching and batch processing.
+    Optimized stock tokenizer with caching.
     
     OPTIMIZATIONS:
     - LRU cache for repeated tokenizations
     - Pre-computed threshold comparisons
-    - Batch tokenization for multiple stocks
     - Reduced memory allocations
     """
     
-    def __init__(self):
+    def __init__(self, max_cache_size: int = 10000):
+        """
+        Args:
+            max_cache_size: Maximum entries in the in-process LRU
+        """
         # Pre-defined thresholds (frozen for performance)
         self.PRICE_STRONG_UP = 2.0
         self.PRICE_UP = 0.5
@@ -61,8 +77,14 @@ class OptimizedTokenizer:
         self._price_down_tokens = frozenset(['price_down', 'falling', 'growth_negative'])
         self._price_strong_down_tokens = frozenset(['price_down', 'price_strong_down', 'falling', 'bearish', 'growth_negative'])
         
-        # Cache for tokenization results
-        self._cache: Dict[str, List[str]] = {}
+        # Per-thread scratch buffers reused across _compute_tokens calls
+        # (Flask serves requests from several threads)
+        self._scratch = threading.local()
+        
+        # Cache for tokenization results (in-process LRU)
+        self._cache: OrderedDict[str, List[str]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._max_cache_size = max_cache_size
         self._cache_hits = 0
         self._cache_misses = 0
     
@@ -80,23 +102,37 @@ class OptimizedTokenizer:
         """
         cache_key = self._cache_key(stock_data)
         
-        if cache_key in self._cache:
-            self._cache_hits += 1
-            return self._cache[cache_key]
+        with self._cache_lock:
+            tokens = self._cache.get(cache_key)
+            if tokens is not None:
+                self._cache.move_to_end(cache_key)
+                self._cache_hits += 1
+                return tokens
         
         self._cache_misses += 1
         tokens = self._compute_tokens(stock_data)
         
-        # Limit cache size
-        if len(self._cache) > 10000:
-            self._cache.clear()
+        with self._cache_lock:
+            self._cache[cache_key] = tokens
+            # Limit cache size
+            if len(self._cache) > self._max_cache_size:
+                self._cache.popitem(last=False)
         
-        self._cache[cache_key] = tokens
         return tokens
     
+    def _scratch_buffers(self):
+        """Return this thread's (tokens, seen) scratch buffers, emptied"""
+        scratch = self._scratch
+        if not hasattr(scratch, 'tokens'):
+            scratch.tokens = []
+            scratch.seen = set()
+        scratch.tokens.clear()
+        return scratch.tokens, scratch.seen
+    
     def _compute_tokens(self, stock_data: Dict[str, Any]) -> List[str]:
         """Compute tokens without caching"""
-        tokens: List[str] = []
+        # OPTIMIZATION: Reuse scratch buffers; only the deduped result is allocated
+        tokens, seen = self._scratch_buffers()
         
         # Price movement tokens
         change = stock_data.get('change_percent')
@@ -132,11 +168,7 @@ class OptimizedTokenizer:
                 pass
         
         # Sector tokens
-        sector = stock_data.get('sector', '').strip()
-        if sector and sector != 'Unknown':
-            sector_token = f"sector_{sector.replace(' ', '_').lower()}"
-            tokens.append(sector_token)
-            tokens.append(sector.lower())
+        self._add_sector_tokens(tokens, stock_data.get('sector', ''))
         
         # Market cap tokens
         market_cap = stock_data.get('market_cap')
@@ -153,34 +185,27 @@ class OptimizedTokenizer:
                 pass
         
         # Symbol and name tokens
-        symbol = stock_data.get('symbol', '').upper()
-        if symbol:
+        self._add_name_tokens(tokens, stock_data.get('symbol', ''), stock_data.get('company_name', ''))
+        
+        return _dedupe(tokens, seen)
+    
+    def _add_sector_tokens(self, tokens: List[str], sector: Any) -> None:
+        """Append sector tokens; a missing or non-string sector adds none"""
+        sector = sector.strip() if isinstance(sector, str) else ''
+        if sector and sector != 'Unknown':
+            sector_token = f"sector_{sector.replace(' ', '_').lower()}"
+            tokens.append(sector_token)
+            tokens.append(sector.lower())
+    
+    def _add_name_tokens(self, tokens: List[str], symbol: Any, company_name: Any) -> None:
+        """Append symbol and company-name tokens"""
+        if symbol and isinstance(symbol, str):
             tokens.append(symbol.lower())
         
-        company_name = stock_data.get('company_name', '')
-        if company_name:
+        if company_name and isinstance(company_name, str):
             # Efficient tokenization
             name_words = company_name.lower().replace(',', ' ').replace('.', ' ').split()
-            stopwords = {'inc', 'corp', 'corporation', 'company', 'co', 'ltd', 'limited', 'the'}
-            tokens.extend(w for w in name_words if w not in stopwords and len(w) > 1)
-        
-        # Remove duplicates while preserving order
-        seen: Set[str] = set()
-        unique_tokens = []
-        for token in tokens:
-            if token not in seen:
-                seen.add(token)
-                unique_tokens.append(token)
-        
-        return unique_tokens
-    
-    def tokenize_batch(self, stocks: List[Dict[str, Any]]) -> List[List[str]]:
-        """
-        Batch tokenize multiple stocks.
-        
-        OPTIMIZATION: Reduces function call overhead for large batches.
-        """
-        return [self.tokenize_stock_fast(stock) for stock in stocks]
+            tokens.extend(w for w in name_words if w not in _NAME_STOPWORDS and len(w) > 1)
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get tokenizer cache statistics"""
@@ -349,6 +374,8 @@ class DataFrameOptimizer:
             
             if col_type == 'object':
                 num_unique = df[col].nunique()
+                # Only mostly-repeated columns; free text such as names and
+                # descriptions stays object so new values can be assigned
                 if num_unique / len(df) < 0.5:  # Less than 50% unique
                     df[col] = df[col].astype('category')
             
@@ -400,47 +427,53 @@ optimized_tokenizer = OptimizedTokenizer()
 vectorized_scorer = VectorizedScoring()
 
 
+# Keyword mappings (subset for common queries)
+_QUERY_KEYWORD_MAP = {
+    'rising': ['price_up', 'rising'],
+    'falling': ['price_down', 'falling'],
+    'up': ['price_up'],
+    'down': ['price_down'],
+    'tech': ['sector_technology', 'technology'],
+    'technology': ['sector_technology', 'technology'],
+    'finance': ['sector_financial_services'],
+    'healthcare': ['sector_healthcare'],
+    'energy': ['sector_energy'],
+    'automotive': ['sector_automotive'],
+    'large cap': ['large_cap', 'blue_chip'],
+    'small cap': ['small_cap'],
+    'volume': ['volume_high'],
+    'volatile': ['high_volatility'],
+}
+
+# All phrases in one alternation, longest first so 'technology' wins over 'tech'
+_QUERY_PHRASE_RE = re.compile(
+    '|'.join(map(re.escape, sorted(_QUERY_KEYWORD_MAP, key=len, reverse=True)))
+)
+
+_QUERY_STOPWORDS = frozenset(['the', 'a', 'an', 'and', 'or', 'with', 'in', 'of', 'for', 'to', 'stocks', 'stock'])
+
+
 @lru_cache(maxsize=1000)
 def tokenize_query_cached(query: str) -> tuple:
     """
     LRU cached query tokenization.
     
-    OPTIMIZATION: Avoids recomputing for repeated queries.
+    OPTIMIZATION: Avoids recomputing for repeated queries, and matches
+    every known phrase in a single compiled-regex scan.
     Returns tuple for hashability.
     """
     query_lower = query.lower().strip()
     tokens = []
     
-    # Keyword mappings (subset for common queries)
-    keyword_map = {
-        'rising': ['price_up', 'rising'],
-        'falling': ['price_down', 'falling'],
-        'up': ['price_up'],
-        'down': ['price_down'],
-        'tech': ['sector_technology', 'technology'],
-        'technology': ['sector_technology', 'technology'],
-        'finance': ['sector_financial_services'],
-        'healthcare': ['sector_healthcare'],
-        'energy': ['sector_energy'],
-        'automotive': ['sector_automotive'],
-        'large cap': ['large_cap', 'blue_chip'],
-        'small cap': ['small_cap'],
-        'volume': ['volume_high'],
-        'volatile': ['high_volatility'],
-    }
-    
     # Match phrases first
-    for phrase, phrase_tokens in keyword_map.items():
-        if phrase in query_lower:
-            tokens.extend(phrase_tokens)
+    for match in _QUERY_PHRASE_RE.finditer(query_lower):
+        tokens.extend(_QUERY_KEYWORD_MAP[match.group()])
     
     # Then individual words
-    stopwords = {'the', 'a', 'an', 'and', 'or', 'with', 'in', 'of', 'for', 'to', 'stocks', 'stock'}
-    words = query_lower.split()
-    for word in words:
-        if word in keyword_map:
-            tokens.extend(keyword_map[word])
-        elif word not in stopwords and len(word) > 1:
+    for word in query_lower.split():
+        if word in _QUERY_KEYWORD_MAP:
+            tokens.extend(_QUERY_KEYWORD_MAP[word])
+        elif word not in _QUERY_STOPWORDS and len(word) > 1:
             tokens.append(word)
     
     # Remove duplicates
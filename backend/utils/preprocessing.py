@@ -5,29 +5,107 @@ Enhanced text preprocessing utilities for stock data
 import pandas as pd
 import os
 import re
+import atexit
+import csv
+import hashlib
+import pickle
+import sys
+import tempfile
+import threading
+from importlib.util import find_spec
+# spaCy itself is imported on first lemmatization (see _get_nlp)
+SPACY_AVAILABLE = find_spec("spacy") is not None
 try:
-    import spacy
-    SPACY_AVAILABLE = True
-except Exception:
-    spacy = None
-    SPACY_AVAILABLE = False
+    from joblib import Parallel, delayed, cpu_count
+    JOBLIB_AVAILABLE = True
+except ImportError:
+    JOBLIB_AVAILABLE = False
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PYARROW_AVAILABLE = False
+try:
+    import charset_normalizer
+    CHARSET_NORMALIZER_AVAILABLE = True
+except ImportError:
+    charset_normalizer = None
+    CHARSET_NORMALIZER_AVAILABLE = False
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    ahocorasick = None
+    AHOCORASICK_AVAILABLE = False
 import logging
-from typing import List, Union
+from functools import lru_cache
+from multiprocessing import Pool
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from utils.optimized_processing import DataFrameOptimizer
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
-# Load spaCy model if available
-nlp = None
-if SPACY_AVAILABLE:
+@lru_cache(maxsize=1)
+def _get_nlp():
+    """
+    Build the lemmatize-only spaCy pipeline on first use, or None if unavailable.
+
+    Deferred so that importing this module (e.g. for parse_query_filters or
+    load_dataset) doesn't pay for importing spaCy and its lookup tables.
+    A blank English model with the lookup lemmatizer skips the tagger/parser/NER
+    of en_core_web_sm entirely. Trade-off: lemmas come from a word table rather
+    than being conditioned on part of speech, so noun/verb homographs share one lemma.
+    """
+    if not SPACY_AVAILABLE:
+        return None
     try:
-        nlp = spacy.load("en_core_web_sm")
+        import spacy
+        nlp = spacy.blank("en")
+        nlp.add_pipe("lemmatizer", config={"mode": "lookup"})
+        nlp.initialize()  # Loads the lookup table from spacy-lookups-data
+        return nlp
     except Exception:
-        logger.warning("spaCy is installed but model 'en_core_web_sm' not available. Continuing without spaCy.")
-        nlp = None
+        logger.warning("spaCy is installed but the lookup lemmatizer (spacy-lookups-data) is not available. Continuing without spaCy.")
+        return None
+
+# Token -> lemmas, filled on first sight. An LRU capped at
+# LEMMA_CACHE_MAX_SIZE: past the cap only the least recently used tokens
+# are dropped, so the warm vocabulary survives. Set LEMMA_CACHE_PATH to
+# persist it across restarts so a warm start skips spaCy for known tokens.
+_LEMMA_CACHE: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+_lemma_cache_lock = threading.Lock()
+LEMMA_CACHE_MAX_SIZE = 200_000
+LEMMA_CACHE_PATH = os.environ.get("LEMMA_CACHE_PATH")
+
+# Compiled once; clean_text/tokenize run for every cell of the dataset
+_WS_RE = re.compile(r'\s+')
+# Tokens are runs of 2+ letters, digits, $ or % (keep important symbols);
+# everything else, whitespace and punctuation alike, separates tokens
+_TOKEN_RE = re.compile(r'[a-z0-9$%]{2,}')
+
+# Batch variant for _tokenize_batch: the cell separator is matched as its
+# own token
+_CELL_SEP = '\x1e'
+_BATCH_TOKEN_RE = re.compile(r'[a-z0-9$%]{2,}|\x1e')
 
-# Enhanced stopwords list
-STOPWORDS = {
+# load_dataset keeps a Parquet copy of the CSV at <csv path> + this suffix
+PARQUET_CACHE_SUFFIX = ".parquet"
+_PARQUET_DIGEST_KEY = b"source_sha256"
+# "<size>:<mtime_ns>" of the CSV the cache was written from; while it still
+# matches, the CSV isn't read (hashed) at all
+_PARQUET_STAMP_KEY = b"source_stat"
+
+# Below this many rows, worker start-up costs more than it saves
+PARALLEL_MIN_ROWS = 10_000
+
+# Enhanced stopwords list (frozen: only ever used for membership tests)
+STOPWORDS = frozenset({
     "the", "is", "and", "a", "an", "in", "on", "at", "of", "to", "for", 
     "by", "with", "that", "this", "it", "as", "are", "was", "were", 
     "be", "been", "from", "or", "not", "but", "if", "then", "so", 
@@ -35,18 +113,10 @@ STOPWORDS = {
     "you", "your", "we", "our", "they", "their", "this", "that",
     "have", "has", "had", "do", "does", "did", "will", "would", "could",
     "should", "may", "might", "must", "can"
-}
+})
 
-def load_dataset(file_path: str = None) -> pd.DataFrame:
-    """
-    Load dataset with enhanced error handling and validation
-    
-    Args:
-        file_path: Path to the dataset file
-    
-    Returns:
-        pandas DataFrame
-    """
+def _resolve_dataset_path(file_path: str = None) -> str:
+    """Find the dataset file, trying the usual locations when no path is given"""
     if file_path is None:
         # Try multiple possible locations
         base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -69,24 +139,166 @@ def load_dataset(file_path: str = None) -> pd.DataFrame:
         else:
             raise FileNotFoundError(f"Could not find dataset file. Tried: {possible_paths}")
     
-    logger.info(f"Loading dataset from: {file_path}")
-    
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Dataset file not found: {file_path}")
     
+    return file_path
+
+def _detect_encoding(head: bytes) -> str:
+    """Guess the text encoding of a file prefix"""
+    if CHARSET_NORMALIZER_AVAILABLE:
+        encoding = charset_normalizer.detect(head)["encoding"] or "utf-8"
+    else:
+        try:
+            head.decode("utf-8")
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+    # An ASCII prefix says nothing about the rest of the file; utf-8 is a superset
+    return "utf-8" if encoding.lower() == "ascii" else encoding
+
+def _detect_csv_format(file_path: str, sample_bytes: int = 64 * 1024) -> Tuple[str, str]:
+    """
+    Pick the (delimiter, encoding) of a CSV from its first sample_bytes.
+
+    The encoding is detected from the raw bytes and the delimiter with
+    csv.Sniffer, so the file only has to be parsed once afterwards.
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(sample_bytes)
+    
     try:
-        # Try different delimiters and encodings
-        for delimiter in [',', ';', '\t']:
-            for encoding in ['utf-8', 'latin-1', 'cp1252']:
-                try:
-                    df = pd.read_csv(file_path, delimiter=delimiter, encoding=encoding)
-                    if not df.empty:
-                        logger.info(f"Successfully loaded dataset with delimiter '{delimiter}' and encoding '{encoding}'")
-                        return df
-                except (pd.errors.ParserError, UnicodeDecodeError):
-                    continue
+        encoding = _detect_encoding(head)
+        # The prefix may end mid-character; that doesn't matter for sniffing
+        sample = head.decode(encoding, errors="ignore")
+        delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t").delimiter
+        return delimiter, encoding
+    except (csv.Error, LookupError) as e:
+        logger.debug(f"CSV sniffing failed ({e}); trying common formats")
+    
+    return _probe_csv_format(file_path)
+
+def _probe_csv_format(file_path: str, sample_rows: int = 1000) -> Tuple[str, str]:
+    """Fallback: pick a (delimiter, encoding) pair that parses the head of the file"""
+    for delimiter in [',', ';', '\t']:
+        for encoding in ['utf-8', 'latin-1', 'cp1252']:
+            try:
+                sample = pd.read_csv(file_path, delimiter=delimiter, encoding=encoding, nrows=sample_rows)
+                if not sample.empty:
+                    return delimiter, encoding
+            except (pd.errors.ParserError, UnicodeDecodeError):
+                continue
+    
+    raise ValueError("Could not parse dataset with common delimiters and encodings")
+
+def _file_digest(file_path: str) -> str:
+    """SHA-256 of the file contents, used to invalidate the Parquet cache"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _file_stamp(file_path: str) -> str:
+    """Size and modification time of a file, as stored in the Parquet cache"""
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def _read_parquet_cache(file_path: str, stamp: str) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """
+    Return (cached DataFrame or None, CSV digest if it had to be computed).
+
+    A matching size/mtime stamp is trusted without reading the CSV; otherwise
+    the CSV is hashed and the cache is still used if the content is unchanged.
+    """
+    cache_path = file_path + PARQUET_CACHE_SUFFIX
+    if not PYARROW_AVAILABLE or not os.path.exists(cache_path):
+        return None, None
+    digest = None
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+        if metadata.get(_PARQUET_STAMP_KEY) != stamp.encode():
+            # Touched, copied or edited: compare contents
+            digest = _file_digest(file_path)
+            if metadata.get(_PARQUET_DIGEST_KEY) != digest.encode():
+                return None, digest
+        # pandas metadata in the file restores categoricals and downcast dtypes
+        df = pq.read_table(cache_path).to_pandas()
+        # Categorical codes come back as read-only views of Arrow buffers;
+        # copy them (small integer arrays) so callers can assign into df
+        for column in df.select_dtypes(include="category").columns:
+            df[column] = df[column].copy()
+        if digest is not None:
+            # Same content under a new stamp: re-stamp so later loads skip the hash
+            _write_parquet_cache(df, file_path, digest, stamp)
+        return df, digest
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable Parquet cache {cache_path}: {e}")
+        return None, digest
+
+def _write_parquet_cache(df: pd.DataFrame, file_path: str, digest: str, stamp: str) -> None:
+    """Store df next to the CSV, tagged with the CSV's content digest and stamp"""
+    if not PYARROW_AVAILABLE:
+        return
+    cache_path = file_path + PARQUET_CACHE_SUFFIX
+    tmp_path = None
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = {
+            **(table.schema.metadata or {}),
+            _PARQUET_DIGEST_KEY: digest.encode(),
+            _PARQUET_STAMP_KEY: stamp.encode(),
+        }
+        # Write beside the target, then rename over it: a crash or a
+        # concurrent start never leaves a truncated cache to be read back
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(cache_path) or ".", suffix=PARQUET_CACHE_SUFFIX, delete=False
+        ) as tmp:
+            tmp_path = tmp.name
+            pq.write_table(table.replace_schema_metadata(metadata), tmp, compression="zstd")
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+    except Exception as e:
+        # Read-only deployments just skip the cache
+        logger.warning(f"Could not write Parquet cache {cache_path}: {e}")
+    finally:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+def load_dataset(file_path: str = None) -> pd.DataFrame:
+    """
+    Load dataset with enhanced error handling and validation
+    
+    Args:
+        file_path: Path to the dataset file
+    
+    Returns:
+        pandas DataFrame
+    """
+    file_path = _resolve_dataset_path(file_path)
+    logger.info(f"Loading dataset from: {file_path}")
+    
+    # Reuse the Parquet copy written by a previous load of the same content
+    stamp = _file_stamp(file_path)
+    df, digest = _read_parquet_cache(file_path, stamp)
+    if df is not None:
+        logger.info(f"Loaded dataset from Parquet cache: {file_path}{PARQUET_CACHE_SUFFIX}")
+        return df
+    
+    try:
+        delimiter, encoding = _detect_csv_format(file_path)
+        df = pd.read_csv(file_path, delimiter=delimiter, encoding=encoding, engine="c")
+        if df.empty:
+            raise ValueError(f"Dataset is empty: {file_path}")
         
-        raise ValueError("Could not parse dataset with common delimiters and encodings")
+        logger.info(f"Successfully loaded dataset with delimiter '{delimiter}' and encoding '{encoding}'")
+        # Low-cardinality text columns become categoricals
+        df = DataFrameOptimizer.optimize_dtypes(df)
+        _write_parquet_cache(df, file_path, digest or _file_digest(file_path), stamp)
+        return df
         
     except Exception as e:
         logger.error(f"Error loading dataset: {e}")
@@ -99,7 +311,7 @@ def clean_text(text: str) -> str:
     if not isinstance(text, str):
         return ""
     # Remove extra whitespace and normalize
-    text = re.sub(r'\s+', ' ', text.strip())
+    text = _WS_RE.sub(' ', text.strip())
     return text
 
 def tokenize(text: Union[str, float]) -> List[str]:
@@ -115,19 +327,16 @@ def tokenize(text: Union[str, float]) -> List[str]:
     if not isinstance(text, str) or pd.isna(text):
         return []
     
-    text = clean_text(text)
-    text = text.lower()
-    
-    # Remove punctuation but keep important symbols like $, %
-    text = re.sub(r'[^\w\s$%]', ' ', text)
-    
-    # Extract tokens
-    tokens = re.findall(r'\b[a-z0-9$%]+\b', text)
-    
-    # Filter tokens
-    tokens = [token for token in tokens if len(token) >= 2 and token not in STOPWORDS]
-    
-    return tokens
+    # Fresh list so callers can't mutate the memoized result
+    return list(_tokenize_cached(text))
+
+@lru_cache(maxsize=100_000)
+def _tokenize_cached(text: str) -> tuple:
+    """Memoized body of tokenize; stock descriptions repeat across rows and queries"""
+    # One scan over the lowered text; the pattern already skips whitespace
+    # and punctuation and enforces the minimum token length
+    stopwords = STOPWORDS
+    return tuple(token for token in _TOKEN_RE.findall(text.lower()) if token not in stopwords)
 
 def remove_stopwords(tokens: List[str]) -> List[str]:
     """
@@ -142,118 +351,284 @@ def lemmatize_tokens(tokens: List[str]) -> List[str]:
     if not tokens:
         return []
     
-    if SPACY_AVAILABLE and nlp is not None:
+    if _get_nlp() is not None:
         try:
-            doc = nlp(" ".join(tokens))
-            lemmas = [token.lemma_.lower() for token in doc if not token.is_punct and not token.is_space]
-            return lemmas
+            lemmas = _lookup_lemmas(tokens)
+            return [lemma for token in tokens for lemma in lemmas[token]]
         except Exception as e:
             logger.error(f"Error in lemmatization: {e}")
             return tokens
     # Fallback: no spaCy available, return tokens as-is
     return tokens  # Return original tokens if lemmatization not possible
 
+def _lookup_lemmas(tokens: Iterable[str]) -> Dict[str, Tuple[str, ...]]:
+    """
+    Map every distinct token to its lemmas, running spaCy only on tokens
+    not yet in _LEMMA_CACHE.
+
+    The result is local to the call, so evictions while the cache is
+    updated cannot drop lemmas this batch still needs. spaCy runs outside
+    the cache lock.
+    """
+    cache = _LEMMA_CACHE
+    lemmas = {}
+    unknown = []
+    with _lemma_cache_lock:
+        for token in dict.fromkeys(tokens):
+            cached = cache.get(token)
+            if cached is None:
+                unknown.append(token)
+            else:
+                cache.move_to_end(token)
+                lemmas[token] = cached
+    if not unknown:
+        return lemmas
+
+    # Each value is the token's lemmas, flattened into every row containing the
+    # token; an immutable tuple can be shared by all those rows safely
+    fresh = {token: (lemma,) for token, lemma in zip(unknown, _spacy_lemmas(unknown))}
+    lemmas.update(fresh)
+
+    with _lemma_cache_lock:
+        cache.update(fresh)
+        _trim_lemma_cache()
+    return lemmas
+
+def _trim_lemma_cache() -> None:
+    """Evict least recently used lemmas down to LEMMA_CACHE_MAX_SIZE (caller holds the lock)"""
+    cache = _LEMMA_CACHE
+    while len(cache) > LEMMA_CACHE_MAX_SIZE:
+        cache.popitem(last=False)
+
+def _spacy_lemmas(words: List[str]) -> List[str]:
+    """
+    Lowercased lemma of each word, in order.
+
+    The words are already split, so they become the words of one Doc and
+    only the lemmatizer component runs; spaCy's tokenizer is skipped. The
+    lookup lemmatizer is context-free, so each word's lemma is independent
+    of its neighbours.
+    """
+    from spacy.tokens import Doc  # spaCy is loaded by _get_nlp by now
+
+    nlp = _get_nlp()
+    doc = nlp.get_pipe("lemmatizer")(Doc(nlp.vocab, words=words))
+    return [word.lemma_.lower() for word in doc]
+
+def _load_lemma_cache(path: str) -> None:
+    """Seed _LEMMA_CACHE from a pickle written by a previous run"""
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, "rb") as f:
+            loaded = pickle.load(f)
+        with _lemma_cache_lock:
+            _LEMMA_CACHE.update(loaded)
+            _trim_lemma_cache()
+        logger.info(f"Loaded {len(_LEMMA_CACHE)} cached lemmas from {path}")
+    except Exception as e:
+        logger.warning(f"Could not load lemma cache from {path}: {e}")
+
+def _save_lemma_cache(path: str) -> None:
+    """Persist _LEMMA_CACHE for the next run (registered with atexit)"""
+    with _lemma_cache_lock:
+        snapshot = _LEMMA_CACHE.copy()
+    try:
+        with open(path, "wb") as f:
+            # Saved in LRU order, so a reload keeps the same eviction order
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logger.warning(f"Could not save lemma cache to {path}: {e}")
+
+if SPACY_AVAILABLE and LEMMA_CACHE_PATH:
+    _load_lemma_cache(LEMMA_CACHE_PATH)
+    atexit.register(_save_lemma_cache, LEMMA_CACHE_PATH)
+
 def preprocess_text(text: Union[str, float]) -> List[str]:
     """
     Complete text preprocessing pipeline
     """
+    # tokenize already drops stopwords
     tokens = tokenize(text)
-    tokens = remove_stopwords(tokens)
     tokens = lemmatize_tokens(tokens)
     return tokens
 
 
+# Synonym -> canonical sector; matched as substrings, earlier entries win
+_SECTOR_SYNONYMS = {
+    "tech": "Technology",
+    "technology": "Technology",
+    "software": "Technology",
+    "semiconductor": "Technology",
+    "finance": "Financial Services",
+    "financials": "Financial Services",
+    "financial": "Financial Services",
+    "bank": "Financial Services",
+    "banks": "Financial Services",
+    "investment": "Financial Services",
+    "forex": "Financial Services",
+    "health": "Healthcare",
+    "healthcare": "Healthcare",
+    "pharma": "Healthcare",
+    "biotech": "Healthcare",
+    "pharmaceutical": "Healthcare",
+    "hospital": "Healthcare",
+    "energy": "Energy",
+    "oil": "Energy",
+    "renewable": "Energy",
+    "power": "Energy",
+    "utilities": "Utilities",
+    "utility": "Utilities",
+    "gas": "Energy",
+    "fuel": "Energy",
+    "nuclear": "Energy",
+    "retail": "Retail",
+    "consumer": "Consumer",
+    "fmcg": "Consumer",
+    "goods": "Consumer",
+    "beverage": "Consumer",
+    "food": "Consumer",
+    "auto": "Automotive",
+    "automotive": "Automotive",
+    "car": "Automotive",
+    "vehicle": "Automotive",
+    "automobile": "Automotive",
+    "motor": "Automotive",
+    "india": "India",
+    "indian": "India",
+    "nse": "India",
+    "bse": "India",
+    "industrial": "Industrial",
+    "manufacturing": "Industrial",
+    "machinery": "Industrial",
+    "engineering": "Industrial",
+    "construction": "Industrial",
+    "telecom": "Telecom",
+    "communication": "Telecom",
+    "wireless": "Telecom",
+    "mobile": "Telecom",
+    "realty": "Realty",
+    "real": "Realty",
+    "estate": "Realty",
+    "property": "Realty",
+    "metal": "Metals",
+    "metals": "Metals",
+    "mining": "Metals",
+    "mine": "Metals",
+    "steel": "Metals",
+    "chemical": "Chemicals",
+    "chemicals": "Chemicals",
+    "infrastructure": "Infrastructure",
+    "infra": "Infrastructure",
+    "transport": "Infrastructure",
+    "logistics": "Infrastructure",
+}
+
 def normalize_sector(term: str) -> str:
     """Normalize various sector/category synonyms to canonical sector names."""
     if not term or not isinstance(term, str):
         return ""
     t = term.lower()
-    mapping = {
-        "tech": "Technology",
-        "technology": "Technology",
-        "software": "Technology",
-        "semiconductor": "Technology",
-        "finance": "Financial Services",
-        "financials": "Financial Services",
-        "financial": "Financial Services",
-        "bank": "Financial Services",
-        "banks": "Financial Services",
-        "investment": "Financial Services",
-        "forex": "Financial Services",
-        "health": "Healthcare",
-        "healthcare": "Healthcare",
-        "pharma": "Healthcare",
-        "biotech": "Healthcare",
-        "pharmaceutical": "Healthcare",
-        "hospital": "Healthcare",
-        "energy": "Energy",
-        "oil": "Energy",
-        "renewable": "Energy",
-        "power": "Energy",
-        "utilities": "Utilities",
-        "utility": "Utilities",
-        "gas": "Energy",
-        "fuel": "Energy",
-        "nuclear": "Energy",
-        "retail": "Retail",
-        "consumer": "Consumer",
-        "fmcg": "Consumer",
-        "goods": "Consumer",
-        "beverage": "Consumer",
-        "food": "Consumer",
-        "auto": "Automotive",
-        "automotive": "Automotive",
-        "car": "Automotive",
-        "vehicle": "Automotive",
-        "automobile": "Automotive",
-        "motor": "Automotive",
-        "india": "India",
-        "indian": "India",
-        "nse": "India",
-        "bse": "India",
-        "industrial": "Industrial",
-        "manufacturing": "Industrial",
-        "machinery": "Industrial",
-        "engineering": "Industrial",
-        "construction": "Industrial",
-        "telecom": "Telecom",
-        "communication": "Telecom",
-        "wireless": "Telecom",
-        "mobile": "Telecom",
-        "realty": "Realty",
-        "real": "Realty",
-        "estate": "Realty",
-        "property": "Realty",
-        "metal": "Metals",
-        "metals": "Metals",
-        "mining": "Metals",
-        "mine": "Metals",
-        "steel": "Metals",
-        "chemical": "Chemicals",
-        "chemicals": "Chemicals",
-        "infrastructure": "Infrastructure",
-        "infra": "Infrastructure",
-        "transport": "Infrastructure",
-        "logistics": "Infrastructure",
-    }
-    for k, v in mapping.items():
-        if k in t:
-            return v
+    if _SECTOR_AC is not None:
+        # One pass over t; the lowest-priority hit is the first synonym in table order
+        best = min((value for _, value in _SECTOR_AC.iter(t)), default=None)
+        if best:
+            return best[1]
+    else:
+        for k, v in _SECTOR_SYNONYMS.items():
+            if k in t:
+                return v
     # fallback: title-case the input
     return term.strip().title()
 
 
+# Trend keywords; when both directions appear, 'up' wins
+_UP_KEYWORDS = ["up", "increase", "increasing", "growing", "gain", "rising", "inc", "positive"]
+_DOWN_KEYWORDS = ["down", "decrease", "decreasing", "fall", "falling", "drop", "loss", "decline", "dec","decr", "downward"]
+
+# Common sector words and their related keywords; earlier sectors win duplicates
+_SECTOR_CANDIDATES = {
+    "technology": ["technology", "tech", "software", "semiconductor", "it", "computing", "digital", "it sector", "hi-tech", "hitech"],
+    "financial": ["financial", "finance", "bank", "banks", "financials", "banking", "investment", "forex"],
+    "healthcare": ["healthcare", "health", "pharma", "biotech", "medical", "medicine", "pharmaceutical", "hospital"],
+    "energy": ["energy", "oil", "renewable", "power", "utilities", "gas", "fuel", "nuclear"],
+    "retail": ["retail", "consumer", "ecommerce", "shopping", "e-commerce", "commerce"],
+    "automotive": ["automotive", "auto", "car", "vehicle", "automobile", "motor"],
+    "india": ["india", "indian", "nse", "bse"],
+    "consumer": ["consumer", "fmcg", "goods", "beverage", "food"],
+    "industrial": ["industrial", "manufacturing", "machinery", "engineering", "construction"],
+    "telecom": ["telecom", "communication", "telecom", "wireless", "mobile"],
+    "utilities": ["utilities", "utility", "water", "electricity"],
+    "realty": ["realty", "real estate", "property", "estate", "real-estate"],
+    "metal": ["metal", "metals", "mining", "mine", "steel"],
+    "chemical": ["chemical", "chemicals", "pharma"],
+    "infrastructure": ["infrastructure", "infra", "transport", "logistics"],
+}
+
+
+def _build_automaton(entries):
+    """
+    Build an Aho-Corasick automaton from (keyword, value) pairs.
+
+    The first value given for a keyword is kept. Values are
+    (priority, result) tuples so callers can take min() over all matches
+    and keep keyword-list precedence in a single pass.
+    Returns None when pyahocorasick is not installed.
+    """
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword, value in entries:
+        if keyword not in automaton:
+            automaton.add_word(keyword, value)
+    automaton.make_automaton()
+    return automaton
+
+
+_TREND_AC = _build_automaton(
+    [(kw, (0, "up")) for kw in _UP_KEYWORDS] + [(kw, (1, "down")) for kw in _DOWN_KEYWORDS]
+)
+
+_SECTOR_AC = _build_automaton(
+    (synonym, (priority, sector)) for priority, (synonym, sector) in enumerate(_SECTOR_SYNONYMS.items())
+)
+
+# Flattened once: keyword -> canonical sector (earlier sectors win duplicates)
+_KEYWORD_TO_SECTOR: Dict[str, str] = {}
+for _sector, _keywords in _SECTOR_CANDIDATES.items():
+    for _keyword in _keywords:
+        _KEYWORD_TO_SECTOR.setdefault(_keyword, normalize_sector(_sector))
+del _sector, _keywords, _keyword
+
+# Multi-word keywords can't be found by a per-word lookup
+_MULTIWORD_SECTOR_KEYWORDS = [
+    (keyword, sector) for keyword, sector in _KEYWORD_TO_SECTOR.items() if " " in keyword
+]
+
+# Query words; hyphenated terms like "e-commerce" stay whole
+_QUERY_WORD_RE = re.compile(r"[\w-]+")
+
+# "All stocks" intent keywords, matched anywhere in the query; one compiled
+# alternation per list replaces a substring test per keyword
+_ALL_KEYWORDS = ['all', 'show all', 'list all', 'get all', 'fetch all', 'display all', 'every', 'everything', 'anything', 'all the']
+_STOCK_KEYWORDS = ['stocks', 'stock', 'companies', 'company', 'shares']
+_ALL_KEYWORDS_RE = re.compile("|".join(map(re.escape, _ALL_KEYWORDS)))
+_STOCK_KEYWORDS_RE = re.compile("|".join(map(re.escape, _STOCK_KEYWORDS)))
+_SHORT_ALL_WORDS = frozenset(['all', 'every', 'everything', 'anything'])
+
+
 def extract_trend_intent(query: str) -> str:
     """Detect trend intent from user query: 'up', 'down', or '' (any)."""
     if not query or not isinstance(query, str):
         return ""
     q = query.lower()
-    up_keywords = ["up", "increase", "increasing", "growing", "gain", "rising", "inc", "positive"]
-    down_keywords = ["down", "decrease", "decreasing", "fall", "falling", "drop", "loss", "decline", "dec","decr", "downward"]
-    for kw in up_keywords:
+    if _TREND_AC is not None:
+        best = min((value for _, value in _TREND_AC.iter(q)), default=None)
+        return best[1] if best else ""
+    for kw in _UP_KEYWORDS:
         if kw in q:
             return "up"
-    for kw in down_keywords:
+    for kw in _DOWN_KEYWORDS:
         if kw in q:
             return "down"
     return ""
@@ -278,49 +653,147 @@ def parse_query_filters(query: str) -> dict:
     q_lower = q.lower()
 
     # Detect "all stocks" intent (e.g., "all stocks", "show all stocks", "all")
-    all_keywords = ['all', 'show all', 'list all', 'get all', 'fetch all', 'display all', 'every', 'everything', 'anything', 'all the']
-    stock_keywords = ['stocks', 'stock', 'companies', 'company', 'shares']
-    has_all = any(keyword in q_lower for keyword in all_keywords)
-    has_stocks = any(keyword in q_lower for keyword in stock_keywords)
-    short_all_words = {'all', 'every', 'everything', 'anything'}
-    is_short_all = q_lower in short_all_words or q_lower.startswith('all ') or q_lower.startswith('show all')
+    has_all = _ALL_KEYWORDS_RE.search(q_lower) is not None
+    has_stocks = _STOCK_KEYWORDS_RE.search(q_lower) is not None
+    is_short_all = q_lower in _SHORT_ALL_WORDS or q_lower.startswith(('all ', 'show all'))
     all_stocks = has_all and (has_stocks or is_short_all)
 
-    # Try to extract a sector mention by simple token scan
-    # Look for common sector words and their related keywords
-    sector_candidates = {
-        "technology": ["technology", "tech", "software", "semiconductor", "it", "computing", "digital", "it sector", "hi-tech", "hitech"],
-        "financial": ["financial", "finance", "bank", "banks", "financials", "banking", "investment", "forex"],
-        "healthcare": ["healthcare", "health", "pharma", "biotech", "medical", "medicine", "pharmaceutical", "hospital"],
-        "energy": ["energy", "oil", "renewable", "power", "utilities", "gas", "fuel", "nuclear"],
-        "retail": ["retail", "consumer", "ecommerce", "shopping", "e-commerce", "commerce"],
-        "automotive": ["automotive", "auto", "car", "vehicle", "automobile", "motor"],
-        "india": ["india", "indian", "nse", "bse"],
-        "consumer": ["consumer", "fmcg", "goods", "beverage", "food"],
-        "industrial": ["industrial", "manufacturing", "machinery", "engineering", "construction"],
-        "telecom": ["telecom", "communication", "telecom", "wireless", "mobile"],
-        "utilities": ["utilities", "utility", "water", "electricity"],
-        "realty": ["realty", "real estate", "property", "estate", "real-estate"],
-        "metal": ["metal", "metals", "mining", "mine", "steel"],
-        "chemical": ["chemical", "chemicals", "pharma"],
-        "infrastructure": ["infrastructure", "infra", "transport", "logistics"],
-    }
-
     found_sector = ""
-    
-    # Check each sector and its related keywords
-    for sector, keywords in sector_candidates.items():
-        for keyword in keywords:
-            if keyword in q_lower:
-                found_sector = normalize_sector(sector)
-                break
+
+    # One dict probe per query word; the first sector word in the query wins
+    for word in _QUERY_WORD_RE.findall(q_lower):
+        found_sector = _KEYWORD_TO_SECTOR.get(word, "")
         if found_sector:
             break
+    else:
+        for keyword, sector in _MULTIWORD_SECTOR_KEYWORDS:
+            if keyword in q_lower:
+                found_sector = sector
+                break
 
     trend = extract_trend_intent(q)
 
     return {"raw": q, "sector": found_sector, "trend": trend, "all_stocks": all_stocks}
 
+def _tokenize_column(series: pd.Series) -> List[List[str]]:
+    """
+    Tokenize a whole text column.
+
+    Applies the same rules as preprocess_text (minus lemmatization) to every
+    cell; non-string cells and numeric columns yield no tokens. Each distinct
+    value is tokenized once, so rows with equal cells share one token list
+    and callers must copy before mutating.
+    """
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return [[] for _ in range(len(series))]
+
+    # Categoricals already carry their distinct values; factorize the rest
+    # (from the raw object array, avoiding per-value pandas boxing)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories.to_numpy(dtype=object)
+    else:
+        codes, uniques = pd.factorize(series.to_numpy(dtype=object))
+
+    unique_tokens = _tokenize_batch([value if isinstance(value, str) else "" for value in uniques])
+    # Code -1 marks a missing value
+    no_tokens = []
+    return [unique_tokens[code] if code >= 0 else no_tokens for code in codes.tolist()]
+
+def _tokenize_batch(texts: List[str]) -> List[List[str]]:
+    """
+    Tokenize many strings with one regex scan over their concatenation.
+
+    Cells are joined with a record-separator sentinel that the scan emits as
+    its own match, so lowercasing and token extraction each run once inside
+    re's C engine instead of once per cell. The sentinel is outside the
+    token alphabet, so no token spans two cells.
+    """
+    joined = _CELL_SEP.join(texts)
+    if joined.count(_CELL_SEP) != len(texts) - 1:
+        # Empty batch, or a cell contains the sentinel itself
+        return [list(_tokenize_cached(text)) if text else [] for text in texts]
+
+    stopwords = STOPWORDS
+    # The vocabulary is small and repeats across rows; interning makes every
+    # occurrence of a token share one string object
+    intern = sys.intern
+    rows = []
+    current = []
+    for token in _BATCH_TOKEN_RE.findall(joined.lower()):
+        if token == _CELL_SEP:
+            rows.append(current)
+            current = []
+        elif token not in stopwords:
+            current.append(intern(token))
+    rows.append(current)
+    return rows
+
+def _lemmatize_rows(rows: List[List[str]]) -> List[List[str]]:
+    """
+    Lemmatize many token lists, running spaCy once over the unseen tokens.
+
+    Parallelism comes from the joblib workers in tokenize_all_columns, so
+    the pipe itself stays single-process to avoid nested worker pools.
+    """
+    if _get_nlp() is None:
+        return rows
+
+    try:
+        lemmas = _lookup_lemmas(chain.from_iterable(rows))
+        return [[lemma for token in tokens for lemma in lemmas[token]] for tokens in rows]
+    except Exception as e:
+        logger.error(f"Error in batch lemmatization: {e}")
+        return rows
+
+def _tokenize_chunk(chunk: pd.DataFrame, text_columns: List[str]) -> List[List[str]]:
+    """
+    Tokenize one block of rows, flattening tokens across columns.
+
+    Runs inside joblib workers, which import this module (and load spaCy)
+    themselves rather than receiving a pickled model.
+    """
+    column_tokens = [_tokenize_column(chunk[col]) for col in text_columns if col in chunk.columns]
+    if not column_tokens:
+        return [[] for _ in range(len(chunk))]
+
+    # Flatten across columns for search, then lemmatize every row in one batch
+    rows = [list(chain.from_iterable(cells)) for cells in zip(*column_tokens)]
+    return _lemmatize_rows(rows)
+
+def _tokenize_parallel(df: pd.DataFrame, text_columns: List[str]) -> List[List[str]]:
+    """
+    Tokenize df in worker processes, one contiguous block of rows per core.
+
+    Uses joblib when installed and falls back to a stdlib multiprocessing
+    Pool otherwise, so large datasets never tokenize on a single core.
+    """
+    n_workers = (cpu_count() if JOBLIB_AVAILABLE else os.cpu_count()) or 1
+    step = -(-len(df) // n_workers)
+    blocks = [df.iloc[start:start + step] for start in range(0, len(df), step)]
+
+    if JOBLIB_AVAILABLE:
+        results = Parallel(n_jobs=-1, batch_size='auto')(
+            delayed(_tokenize_chunk)(block, text_columns) for block in blocks
+        )
+    else:
+        with Pool(n_workers) as pool:
+            results = pool.starmap(_tokenize_chunk, [(block, text_columns) for block in blocks])
+    return [tokens for chunk_rows in results for tokens in chunk_rows]
+
+def _assign_tokens(df: pd.DataFrame, tokenized_rows: List[List[str]]) -> None:
+    """Store per-row token lists as df's 'tokens' column"""
+    if PYARROW_AVAILABLE:
+        # One offsets + values buffer instead of a Python list per row, with
+        # the values dictionary-encoded so each distinct token is stored once;
+        # element access and iteration still yield plain lists
+        tokens = pa.array(tokenized_rows, type=pa.list_(pa.string()))
+        df["tokens"] = pd.arrays.ArrowExtensionArray(
+            pa.ListArray.from_arrays(tokens.offsets, tokens.values.dictionary_encode())
+        )
+    else:
+        df["tokens"] = tokenized_rows
+
 def tokenize_all_columns(df: pd.DataFrame, text_columns: List[str] = None) -> pd.DataFrame:
     """
     Tokenize specified text columns in the DataFrame
@@ -333,23 +806,21 @@ def tokenize_all_columns(df: pd.DataFrame, text_columns: List[str] = None) -> pd
         DataFrame with added 'tokens' column
     """
     if text_columns is None:
-        text_columns = [col for col in df.columns if df[col].dtype == 'object']
+        # load_dataset stores low-cardinality text as categoricals
+        text_columns = [
+            col for col in df.columns
+            if df[col].dtype == 'object' or isinstance(df[col].dtype, pd.CategoricalDtype)
+        ]
     
     logger.info(f"Tokenizing columns: {text_columns}")
     
-    tokenized_rows = []
-    
-    for _, row in df.iterrows():
-        row_tokens = []
-        for col in text_columns:
-            if col in df.columns:
-                tokens = preprocess_text(row[col])
-                row_tokens.extend(tokens)  # Flatten across columns for search
-        
-        tokenized_rows.append(row_tokens)
+    if len(df) >= PARALLEL_MIN_ROWS:
+        tokenized_rows = _tokenize_parallel(df, text_columns)
+    else:
+        tokenized_rows = _tokenize_chunk(df, text_columns)
     
     df = df.copy()
-    df["tokens"] = tokenized_rows
+    _assign_tokens(df, tokenized_rows)
     logger.info("Tokenization completed successfully")
     
     return df
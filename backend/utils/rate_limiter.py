@@ -0,0 +1,72 @@
+"""
+Rate Limiter - In-process sliding-window limits for abuse-prone endpoints
+
+FEATURES:
+- Thread-safe per-key request counting over a sliding window
+- Memory-bounded: least recently seen keys are evicted past max_keys
+- O(1) amortized check, so rejected requests never reach the password KDF
+
+NOTE: State is per process. The deployment runs a single gunicorn worker;
+with several workers each one enforces its own copy of the limit.
+"""
+
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Deque
+
+
+class RateLimiter:
+    """
+    Allow at most `limit` hits per key within `window_seconds`.
+    """
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = 10000):
+        """
+        Args:
+            limit: Maximum hits allowed per key inside the window
+            window_seconds: Length of the sliding window in seconds
+            max_keys: Maximum number of tracked keys
+        """
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> bool:
+        """Record a hit for key; returns False if the key is over its limit."""
+        now = time.monotonic()
+        cutoff = now - self.window_seconds
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+                if len(self._hits) > self.max_keys:
+                    self._hits.popitem(last=False)
+            else:
+                self._hits.move_to_end(key)
+
+            while hits and hits[0] <= cutoff:
+                hits.popleft()
+
+            if len(hits) >= self.limit:
+                return False
+            hits.append(now)
+            return True
+
+    def is_limited(self, key: str) -> bool:
+        """True if key is at its limit; unlike hit(), records nothing."""
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            hits = self._hits.get(key)
+            if not hits:
+                return False
+            while hits and hits[0] <= cutoff:
+                hits.popleft()
+            return len(hits) >= self.limit
+
+    def reset(self, key: str) -> None:
+        """Forget all hits for key."""
+        with self._lock:
+            self._hits.pop(key, None)